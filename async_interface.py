@@ -0,0 +1,671 @@
+import contextvars
+import time
+import uuid
+from contextlib import asynccontextmanager
+from psycopg import AsyncCursor
+from psycopg.rows import dict_row
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool
+from control import Class, Attribute, Reference, AttributeAssignment, Object, User, Group
+from cache import StructureCache, PermissionCache, ObjectCache, PERMISSION_READ
+from exception import StructureNotLoaded
+from identifier import IdStrategy, UUID7IdStrategy
+from metrics import Metrics, instrumented, record_statement
+from interface import UserInterface, STRUCTURE_CHANNEL, REFERENCE_PAIRS_TABLE_QUERY, USER_GROUPS_QUERY, USER_CLASSES_QUERY, EFFECTIVE_PERMISSIONS_QUERY
+
+# Benannte Parameter %(pn)s für die SQL-Generatoren, psycopg 3 bereitet die Anweisungen mit prepare=True selbst vor
+NAMED_PLACEHOLDER = '%(p{})s'
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        begin = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            record_statement(query, begin, self.rowcount)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        params_seq = list(params_seq)
+        begin = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            record_statement(query, begin, self.rowcount, len(params_seq))
+
+class AsyncUserInterface(UserInterface):
+    """ Asynchrone Variante der UserInterface auf Basis von psycopg 3, die Struktur muss vorab mit load_structure() geladen werden und wird nicht bei Bedarf nachgeladen """
+
+    def __init__(self, user: User, connection_pool: AsyncConnectionPool, permission_ttl: float = 60, object_cache_size: int = None, object_cache_ttl: float = None, metrics: Metrics = None, id_strategy: IdStrategy = None, listen_structure: bool = False):
+        if listen_structure:
+            # Strukturabfragen der Klassen sind synchron, ein Nachladen aus der Datenbank ist daher nicht möglich
+            raise ValueError('AsyncUserInterface unterstützt listen_structure nicht, Strukturänderungen anderer Prozesse werden mit refresh_structure() übernommen')
+        self.user = user
+        self.connection_pool = connection_pool
+        self.structure_cache = StructureCache()
+        self.permission_cache = None
+        self.permission_ttl = permission_ttl
+        self.object_cache = ObjectCache(object_cache_size, object_cache_ttl) if object_cache_size else None
+        self.metrics = metrics
+        self.id_strategy = id_strategy or UUID7IdStrategy()
+        self.listen_connection = None
+        self.instance_id = uuid.uuid4().hex
+        self.connection_context = contextvars.ContextVar(f'connection_context_{self.instance_id}', default=None)
+        self.pending_objects = contextvars.ContextVar(f'pending_objects_{self.instance_id}', default=None)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """ Stellt eine Datenbankverbindung aus dem Connection Pool bereit, die am Ende committet oder bei Fehlern zurückgerollt wird """
+        connection = self.connection_context.get()
+        if connection is not None:
+            yield connection
+            return
+        begin = time.perf_counter()
+        pending_token = self.pending_objects.set({})
+        try:
+            async with self.connection_pool.connection() as connection:
+                if self.metrics:
+                    self.metrics.record_pool_wait(time.perf_counter() - begin)
+                    connection.cursor_factory = InstrumentedAsyncCursor
+                # UUIDs wie bei psycopg2 als Zeichenketten laden, damit IDs überall (Objekte, Cache, Ergebnis-Dictionaries) denselben Typ haben
+                connection.adapters.register_loader('uuid', TextLoader)
+                token = self.connection_context.set(connection)
+                try:
+                    yield connection
+                finally:
+                    self.connection_context.reset(token)
+                    connection.cursor_factory = AsyncCursor
+
+            # Erst nach dem Commit sehen andere Aufgaben die Objekte der Transaktion, bei einem Rollback werden sie verworfen
+            self.store_pending_objects(self.pending_objects.get())
+        finally:
+            self.pending_objects.reset(pending_token)
+
+    def cache_object(self, object_: Object):
+        """ Legt ein gelesenes Objekt im Objektcache ab, innerhalb einer Transaktion erst mit deren Commit """
+        if self.object_cache:
+            pending_objects = self.pending_objects.get()
+            if pending_objects is not None:
+                pending_objects[object_.id] = object_
+            else:
+                self.object_cache.store(object_)
+
+    def cache_written_object(self, object_: Object):
+        """ Legt ein erstelltes oder geändertes Objekt im Objektcache ab, innerhalb einer Transaktion erst mit deren Commit """
+        if self.object_cache:
+            self.object_cache.remove(object_.id)
+            self.cache_object(object_)
+
+    def get_cached_object(self, id: str) -> Object:
+        """ Gibt ein Objekt aus dem Objektcache zurück, Schreibzugriffe der laufenden Transaktion haben Vorrang """
+        pending_objects = self.pending_objects.get()
+        if pending_objects and id in pending_objects:
+            return pending_objects[id]
+        return self.object_cache.get(id)
+
+    def get_connection(self):
+        """ Nicht verfügbar, Datenbankzugriffe laufen über transaction() """
+        raise TypeError('AsyncUserInterface stellt Verbindungen nur über transaction() bereit')
+
+    def in_transaction(self) -> bool:
+        """ Gibt zurück, ob die aktuelle Aufgabe sich innerhalb eines transaction()-Blocks befindet """
+        return self.connection_context.get() is not None
+
+    def evict_objects(self, ids: list):
+        """ Entfernt Objekte, die ohne Objektinstanz geschrieben wurden, aus dem Objektcache, innerhalb einer Transaktion nach deren Commit erneut """
+        if self.object_cache:
+            pending_objects = self.pending_objects.get()
+            for id in ids:
+                self.object_cache.remove(id)
+                if pending_objects is not None:
+                    pending_objects[id] = None
+
+    @instrumented
+    async def notify_structure_change(self, kind: str, id: str):
+        """ Veröffentlicht eine Strukturänderung ('class', 'attribute', 'attribute_assignment' oder 'reference'), wird mit dem Commit zugestellt """
+        async with self.transaction() as connection:
+            await connection.execute("SELECT pg_notify(%s, concat_ws(':', nextval('structure.version'), %s, %s, %s))", (STRUCTURE_CHANNEL, self.instance_id, kind, id))
+
+    async def execute_prepared(self, cursor, key: tuple, generator, values: tuple):
+        """ Führt die zum Schlüssel gehörige Anweisung über die Prepared Statements von psycopg 3 aus, generator erzeugt bei Bedarf das SQL mit benannten Parametern (NAMED_PLACEHOLDER) """
+        statement_cache = self.structure_cache.statement_cache
+        statement = statement_cache.get(key)
+        if statement is None:
+            statement = statement_cache.store(key, generator())
+        name, sql = statement
+
+        # psycopg 3 bindet Parameter serverseitig, ein EXECUTE mit Parametern ist dort nicht möglich
+        await cursor.execute(sql, {f'p{i + 1}': value for i, value in enumerate(values)}, prepare=True)
+
+    ################################################## Struktur ##################################################
+    @instrumented
+    async def load_structure(self):
+        """ Lädt alle Klassen, Attribute, Attributzuweisungen und Referenzen gesammelt in einen neuen Strukturcache, der den bisherigen erst nach allen Abfragen ersetzt """
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+
+            # Version vor dem Laden, spätere Änderungen werden von refresh_structure() erkannt
+            await cursor.execute('SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM structure.version')
+            version = (await cursor.fetchone())[0]
+            await cursor.execute('SELECT id, name, parent_id, view_mode, partitions FROM structure.class')
+            class_rows = await cursor.fetchall()
+            await cursor.execute('SELECT id, name, generator, indexed FROM structure.attribute')
+            attribute_rows = await cursor.fetchall()
+            await cursor.execute('SELECT class_id, attribute_id FROM structure.attribute_assignment')
+            assignment_rows = await cursor.fetchall()
+            await cursor.execute('SELECT id, name, origin_class_id, target_class_id FROM structure.reference')
+            reference_rows = await cursor.fetchall()
+
+        # Ohne weiteres await aufbauen, andere Aufgaben sehen bis zum Austausch den bisherigen Strukturcache
+        structure_cache = StructureCache()
+        structure_cache.version = version
+        self.structure_cache = structure_cache
+        classes = [Class(self, row[0], row[1], row[2], row[3], row[4]) for row in class_rows]
+        for class_ in classes:
+            class_.assigned_attributes = []
+        for row in attribute_rows:
+            Attribute(self, row[0], row[1], row[2], row[3])
+        for row in assignment_rows:
+            structure_cache.get_class('id', row[0]).assigned_attributes.append(structure_cache.get_attribute('id', row[1]))
+        for row in reference_rows:
+            Reference(self, row[0], row[1], row[2], row[3])
+
+        # Stammbäume vorberechnen
+        for class_ in classes:
+            class_.get_family_tree()
+
+    @instrumented
+    async def refresh_structure(self) -> bool:
+        """ Lädt die Struktur neu, falls seit dem letzten Laden Strukturänderungen veröffentlicht wurden, und gibt zurück, ob neu geladen wurde """
+        async with self.transaction() as connection:
+            cursor = await connection.execute('SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM structure.version')
+            version = (await cursor.fetchone())[0]
+        if version == self.structure_cache.version:
+            return False
+        await self.load_structure()
+        return True
+
+    def get_class_from_db_by_id(self, id: str) -> Class:
+        raise StructureNotLoaded(f'Klasse {id} ist nicht im Strukturcache, load_structure() aufrufen')
+
+    def get_class_from_db_by_name(self, name: str) -> Class:
+        raise StructureNotLoaded(f'Klasse {name} ist nicht im Strukturcache, load_structure() aufrufen')
+
+    def get_assigned_attributes_from_db(self, class_: Class):
+        raise StructureNotLoaded(f'Attribute der Klasse {class_.name} sind nicht im Strukturcache, load_structure() aufrufen')
+
+    def get_attribute_from_db_by_id(self, id: str) -> Attribute:
+        raise StructureNotLoaded(f'Attribut {id} ist nicht im Strukturcache, load_structure() aufrufen')
+
+    def get_attribute_from_db_by_name(self, name: str) -> Attribute:
+        raise StructureNotLoaded(f'Attribut {name} ist nicht im Strukturcache, load_structure() aufrufen')
+
+    def get_reference_from_db_by_name(self, name: str) -> Reference:
+        raise StructureNotLoaded(f'Referenz {name} ist nicht im Strukturcache, load_structure() aufrufen')
+
+    ################################################## Klasse ##################################################
+    @instrumented
+    async def create_class(self, name: str, parent: Class = None, partitions: int = None) -> Class:
+        """ Erstellt eine neue Objektklasse und gibt Klassenobjekt zurück, mit partitions wird die Klassentabelle in entsprechend viele Hash-Partitionen aufgeteilt """
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            await cursor.execute('INSERT INTO structure.class (name, parent_id, partitions) VALUES (%s, %s, %s) RETURNING id', (name, parent.id if parent else None, partitions))
+            id = (await cursor.fetchone())[0]
+            await cursor.execute(self.get_class_table_sql(name, parent, partitions))
+            await self.notify_structure_change('class', id)
+        class_ = Class(self, id, name, None if parent is None else parent.id, partitions=partitions)
+        class_.assigned_attributes = []
+        return class_
+
+    @instrumented
+    async def update_class_view(self, class_: Class):
+        """ Erstellt oder aktualisiert in der Datenbank eine View zum Anzeigen aller Objekte der übergebenen Klasse """
+        async with self.transaction() as connection:
+            await connection.execute(self.get_class_view_sql(class_))
+
+    @instrumented
+    async def refresh_class_view(self, class_: Class, ids: list = None, concurrently: bool = True):
+        """ Aktualisiert die Daten einer materialisierten bzw. denormalisierten View, mit ids nur die Zeilen der übergebenen Objekte """
+        async with self.transaction() as connection:
+            for sql, values in self.get_refresh_class_view_sql(class_, ids, concurrently):
+                await connection.execute(sql, values)
+
+    @instrumented
+    async def set_class_view_mode(self, class_: Class, view_mode: str):
+        """ Legt fest, ob die View der Klasse als einfache View ('view'), materialisierte View ('materialized') oder über Trigger nachgeführte Tabelle ('table') angelegt wird """
+        async with self.transaction() as connection:
+            await connection.execute(self.get_drop_class_view_sql(class_, class_.view_mode))
+            await connection.execute('UPDATE structure.class SET view_mode = %s WHERE id = %s', (view_mode, class_.id))
+            class_.view_mode = view_mode
+            await connection.execute(self.get_class_view_sql(class_))
+            await self.notify_structure_change('class', class_.id)
+
+    ################################################## Attribut ##################################################
+    @instrumented
+    async def create_attribute(self, name: str, generator: str, indexed: bool) -> Attribute:
+        """ Erstellt ein neues Attribut und gibt Attributobjekt zurück """
+        async with self.transaction() as connection:
+            cursor = await connection.execute('INSERT INTO structure.attribute (name, generator, indexed) VALUES (%s, %s, %s) RETURNING id', (name, generator, indexed))
+            id = (await cursor.fetchone())[0]
+            await self.notify_structure_change('attribute', id)
+        return Attribute(self, id, name, generator, indexed)
+
+    @instrumented
+    async def assign_attribute(self, attribute: Attribute, class_: Class, nullable: bool, default: str = None, index: bool = True, backfill: bool = False) -> bool:
+        """ Weist ein Attribut einer Klasse zu, index und backfill wie bei get_assign_attribute_sql() """
+        async with self.transaction() as connection:
+            await connection.execute('INSERT INTO structure.attribute_assignment (class_id, attribute_id, nullable, "default") VALUES (%s, %s, %s, %s)', (class_.id, attribute.id, nullable, default))
+            await connection.execute(self.get_assign_attribute_sql(attribute, class_, nullable, default, index, backfill))
+            await self.notify_structure_change('attribute_assignment', class_.id)
+        class_.assigned_attributes.append(attribute)
+        self.structure_cache.reset_derived()
+        return AttributeAssignment(self, class_.id, attribute.id, nullable, default)
+
+    ################################################## Referenz ##################################################
+    @instrumented
+    async def create_reference(self, name: str, origin_class: Class, target_class: Class) -> Reference:
+        """ Erstellt eine neue Referenz und gibt Referenzobjekt zurück """
+        async with self.transaction() as connection:
+            cursor = await connection.execute('INSERT INTO structure.reference (name, origin_class_id, target_class_id) VALUES (%s, %s, %s) RETURNING id', (name, origin_class.id, target_class.id))
+            id = (await cursor.fetchone())[0]
+            await connection.execute(self.get_reference_table_sql(name, origin_class, target_class))
+            await self.notify_structure_change('reference', id)
+        return Reference(self, id, name, origin_class.id, target_class.id)
+
+    ################################################## Objekt ##################################################
+    @instrumented
+    async def create_object(self, class_: Class, **attributes) -> Object:
+        """ Erstellt ein Objekt der angegebenen Klasse mithilfe der angegebenen Attribute (att1=x, att2=y, ...) """
+        # Das Objekt vorab erzeugen, damit unbekannte Attribute vor dem Schreiben auffallen
+        object_ = Object(self, self.id_strategy.generate(), class_, **attributes)
+        insert_attributes = tuple(a for a in class_.get_layout() if a in attributes)
+        values = (object_.id, class_.id, self.user.id, *[attributes[a] for a in insert_attributes])
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            await self.execute_prepared(cursor, ('create_object', class_.id, insert_attributes), lambda: self.get_create_object_sql(class_, insert_attributes, NAMED_PLACEHOLDER), values)
+        self.cache_written_object(object_)
+        return object_
+
+    @instrumented
+    async def create_objects(self, class_: Class, rows: list, batch_size: int = 1000) -> list:
+        """ Erstellt mengenbasiert Objekte der angegebenen Klasse, rows ist eine Liste von Attribut-Dictionaries """
+        family_tree = class_.get_family_tree()
+        class_attributes = {c.name: [a.name for a in c.get_assigned_attributes()] for c in family_tree}
+
+        objects = []
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+
+                # IDs clientseitig vorab erzeugen, damit die Zuordnung zwischen Zeilen und IDs eindeutig ist
+                ids = self.id_strategy.generate_many(len(batch))
+                batch_objects = [Object(self, id, class_, **attributes) for id, attributes in zip(ids, batch)]
+
+                # Metadaten der Objekte einfügen
+                await cursor.executemany('INSERT INTO data.meta (id, class_id, creator_id) VALUES (%s, %s, %s)', [(id, class_.id, self.user.id) for id in ids])
+
+                for current_class in family_tree:
+
+                    # Zeilen nach einzufügenden Attributen gruppieren
+                    groups = {}
+                    for id, attributes in zip(ids, batch):
+                        insert_attributes = tuple(a for a in class_attributes[current_class.name] if a in attributes)
+                        groups.setdefault(insert_attributes, []).append((id, *[attributes[a] for a in insert_attributes]))
+
+                    # Je Gruppe gebündelt einfügen
+                    for insert_attributes, values in groups.items():
+                        str_cols = ', '.join(['id', *insert_attributes])
+                        str_values = ', '.join(['%s'] * (len(insert_attributes) + 1))
+                        await cursor.executemany(f'INSERT INTO data.{current_class.name} ({str_cols}) VALUES ({str_values})', values)
+
+                objects.extend(batch_objects)
+        if self.object_cache:
+            for object_ in objects:
+                self.cache_written_object(object_)
+        return objects
+
+    @instrumented
+    async def get_object(self, id: str, class_: Class, enforce_permissions: bool = False) -> Object:
+        """ Gibt ein Objekt anhand der übergebenen ID und Klasse zurück """
+        if self.object_cache and not enforce_permissions:
+            object_ = self.get_cached_object(id)
+            if object_ and object_.get_class() is class_:
+                return object_
+        str_filter, filter_values = self.get_read_filter(class_, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor(row_factory=dict_row)
+            await cursor.execute(f'SELECT * FROM {class_.get_view_name()} AS v WHERE v.id = %s{str_filter}', (id, *filter_values))
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        object_ = self.build_object(class_, row)
+        self.cache_object(object_)
+        return object_
+
+    @instrumented
+    async def iter_objects(self, class_: Class, batch_size: int = 1000, enforce_permissions: bool = False):
+        """ Gibt einen asynchronen Generator über alle Objekte der übergebenen Klasse zurück, die Zeilen werden blockweise über einen serverseitigen Cursor gelesen """
+        str_filter, filter_values = self.get_read_filter(class_, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            async with connection.cursor(name=f'iter_{class_.name}_{uuid.uuid4().hex}', row_factory=dict_row) as cursor:
+                cursor.itersize = batch_size
+                await cursor.execute(f'SELECT * FROM {class_.get_view_name()} AS v WHERE TRUE{str_filter}', filter_values)
+                async for row in cursor:
+                    yield self.build_object(class_, row)
+
+    @instrumented
+    async def find(self, class_: Class, where: dict = None, order_by: str | list = None, limit: int = None, after: Object = None, enforce_permissions: bool = False) -> list:
+        """ Sucht Objekte der Klasse anhand von Attributbedingungen ({attribut: wert} oder {attribut: (operator, wert)}), sortiert nach order_by ('-' für absteigend) und blättert mit after ab dem letzten Objekt der vorherigen Seite """
+        sql, values = self.get_find_sql(class_, where, order_by, limit, after, enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor(row_factory=dict_row)
+            await cursor.execute(sql, values)
+            rows = await cursor.fetchall()
+        return [self.build_object(class_, row) for row in rows]
+
+    @instrumented
+    async def modify(self, object_, **attributes):
+        """ Aktualisiert die übergebenen Attribute des übergebenen Objekts """
+        object_.check_attributes(attributes)
+        class_ = object_.get_class()
+        update_attributes = tuple(a for a in class_.get_layout() if a in attributes)
+        if len(update_attributes) == 0:
+            return
+
+        # Query ausführen
+        values = (object_.id, *[attributes[a] for a in update_attributes])
+        async with self.transaction() as connection:
+            await self.execute_prepared(connection.cursor(), ('modify', class_.id, update_attributes), lambda: self.get_modify_sql(class_, update_attributes, NAMED_PLACEHOLDER), values)
+
+        # Objekt und Objektcache aktualisieren
+        object_.set_values(**attributes)
+        self.cache_written_object(object_)
+
+    @instrumented
+    async def bind(self, origin: Object, target: Object, reference: Reference | str, rebind: bool = False):
+        """ Schafft eine Referenz vom Ursprungs- zum Zielobjekt """
+        reference_name = reference.name if type(reference) is Reference else reference
+        async with self.transaction() as connection:
+            if rebind:
+                await connection.execute(f'DELETE FROM reference.{reference_name} WHERE origin_id = %s', (origin.id,))
+            if target is not None:
+                await connection.execute(f'INSERT INTO reference.{reference_name} (origin_id, target_id) VALUES (%s, %s)', (origin.id, target.id))
+
+    @instrumented
+    async def unbind(self, origin: Object, target: Object, reference: Reference | str):
+        """ Löscht eine bestehende Referenz vom Ursprungs- zum Zielobjekt """
+        reference_name = reference.name if type(reference) is Reference else reference
+        async with self.transaction() as connection:
+            await connection.execute(f'DELETE FROM reference.{reference_name} WHERE origin_id = %s AND target_id = %s', (origin.id, target.id))
+
+    async def copy_reference_pairs(self, cursor, pairs: list):
+        """ Lädt die Paare per COPY in die (je Verbindung einmal angelegte) temporäre Tabelle reference_pairs """
+        await cursor.execute(REFERENCE_PAIRS_TABLE_QUERY)
+        await cursor.execute('TRUNCATE reference_pairs')
+        async with cursor.copy('COPY reference_pairs (origin_id, target_id) FROM STDIN') as copy:
+            await copy.write(self.get_reference_pairs_data(pairs))
+
+    @instrumented
+    async def bind_many(self, pairs: list, reference: Reference | str, rebind: bool = False, on_conflict: str = 'ignore'):
+        """ Schafft mengenbasiert Referenzen für eine Liste von Paaren (Ursprungsobjekt, Zielobjekt) """
+        if len(pairs) == 0:
+            return
+        reference_name = reference.name if type(reference) is Reference else reference
+        queries = self.get_bind_many_sql(reference_name, rebind, on_conflict)
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            await self.copy_reference_pairs(cursor, pairs)
+            for query in queries:
+                await cursor.execute(query)
+
+    @instrumented
+    async def unbind_many(self, pairs: list, reference: Reference | str):
+        """ Löscht mengenbasiert die Referenzen einer Liste von Paaren (Ursprungsobjekt, Zielobjekt) """
+        if len(pairs) == 0:
+            return
+        reference_name = reference.name if type(reference) is Reference else reference
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            await self.copy_reference_pairs(cursor, pairs)
+            await cursor.execute(self.get_unbind_many_sql(reference_name))
+
+    @instrumented
+    async def hop(self, object_: Object, reference: Reference | str, enforce_permissions: bool = False) -> list:
+        """ Gibt die mit dem übergebenen Objekte über die übergebene Referenz verbundenen Objekte zurück """
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        target_class = reference.get_target_class()
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor(row_factory=dict_row)
+            await cursor.execute(f'''
+            SELECT v.* FROM reference.{reference.name} AS r
+            JOIN {target_class.get_view_name()} AS v ON v.id = r.target_id
+            WHERE r.origin_id = %s{str_filter}
+            ''', (object_.id, *filter_values))
+            rows = await cursor.fetchall()
+        return [self.build_object(target_class, row) for row in rows]
+
+    @instrumented
+    async def hop1(self, object_: Object, reference: Reference | str, enforce_permissions: bool = False) -> Object:
+        """ Gibt das erste mit dem übergebenen Objekte über die übergebene Referenz verbundene Objekt zurück """
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        target_class = reference.get_target_class()
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor(row_factory=dict_row)
+            await cursor.execute(f'''
+            SELECT v.* FROM reference.{reference.name} AS r
+            JOIN {target_class.get_view_name()} AS v ON v.id = r.target_id
+            WHERE r.origin_id = %s{str_filter}
+            LIMIT 1
+            ''', (object_.id, *filter_values))
+            row = await cursor.fetchone()
+        return self.build_object(target_class, row) if row else None
+
+    @instrumented
+    async def hop_many(self, objects: list, reference: Reference | str, enforce_permissions: bool = False) -> dict:
+        """ Gibt die mit den übergebenen Objekten über die übergebene Referenz verbundenen Objekte als Dictionary (Ursprungs-ID -> Objektliste) zurück """
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        target_class = reference.get_target_class()
+        result = {o.id: [] for o in objects}
+        if len(result) == 0:
+            return result
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            await cursor.execute(f'''
+            SELECT r.origin_id, v.* FROM reference.{reference.name} AS r
+            JOIN {target_class.get_view_name()} AS v ON v.id = r.target_id
+            WHERE r.origin_id = ANY(%s::uuid[]){str_filter}
+            ''', (list(result), *filter_values))
+            cols = [d[0] for d in cursor.description[1:]]
+            rows = await cursor.fetchall()
+        for row in rows:
+            result[row[0]].append(self.build_object(target_class, dict(zip(cols, row[1:]))))
+        return result
+
+    @instrumented
+    async def reverse_hop(self, object_: Object, reference: Reference | str, enforce_permissions: bool = False) -> list:
+        """ Gibt die Objekte zurück, die über die übergebene Referenz auf das übergebene Objekt verweisen """
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        origin_class = reference.get_origin_class()
+        str_filter, filter_values = self.get_read_filter(origin_class, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor(row_factory=dict_row)
+            await cursor.execute(f'''
+            SELECT v.* FROM reference.{reference.name} AS r
+            JOIN {origin_class.get_view_name()} AS v ON v.id = r.origin_id
+            WHERE r.target_id = %s{str_filter}
+            ''', (object_.id, *filter_values))
+            rows = await cursor.fetchall()
+        return [self.build_object(origin_class, row) for row in rows]
+
+    @instrumented
+    async def reverse_hop_many(self, objects: list, reference: Reference | str, enforce_permissions: bool = False) -> dict:
+        """ Gibt die Objekte, die über die übergebene Referenz auf die übergebenen Objekte verweisen, als Dictionary (Ziel-ID -> Objektliste) zurück """
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        origin_class = reference.get_origin_class()
+        result = {o.id: [] for o in objects}
+        if len(result) == 0:
+            return result
+        str_filter, filter_values = self.get_read_filter(origin_class, 'v', enforce_permissions)
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            await cursor.execute(f'''
+            SELECT r.target_id, v.* FROM reference.{reference.name} AS r
+            JOIN {origin_class.get_view_name()} AS v ON v.id = r.origin_id
+            WHERE r.target_id = ANY(%s::uuid[]){str_filter}
+            ''', (list(result), *filter_values))
+            cols = [d[0] for d in cursor.description[1:]]
+            rows = await cursor.fetchall()
+        for row in rows:
+            result[row[0]].append(self.build_object(origin_class, dict(zip(cols, row[1:]))))
+        return result
+
+    @instrumented
+    async def traverse(self, start: Object | list, path_or_reference: list | Reference | str, max_depth: int = None, with_paths: bool = False, enforce_permissions: bool = False) -> list:
+        """ Verfolgt ab dem Startobjekt (oder einer Liste von Startobjekten) eine Referenz oder einen Referenzpfad bis max_depth Schritte und gibt die erreichten Objekte nach Tiefe sortiert zurück, mit with_paths als (Objekt, ID-Pfad) """
+        references, max_depth, steps = self.get_traverse_plan(path_or_reference, max_depth)
+        start_ids = [o.id for o in (start if type(start) is list else [start])]
+        result = []
+        if len(start_ids) == 0 or max_depth < 1:
+            return result
+        async with self.transaction() as connection:
+            cursor = connection.cursor()
+            if with_paths:
+                for target_class, class_steps in steps.items():
+                    sql, values = self.get_traverse_sql(references, class_steps, target_class, enforce_permissions)
+                    await cursor.execute(sql, (start_ids, max_depth, *values))
+                    cols = [d[0] for d in cursor.description[2:]]
+                    for row in await cursor.fetchall():
+                        result.append((row[0], self.build_object(target_class, dict(zip(cols, row[2:]))), row[1]))
+            else:
+                # Breitensuche Ebene für Ebene wie in UserInterface.traverse
+                visited = set()
+                reached = {target_class: {} for target_class in steps}
+                frontier = start_ids
+                for depth in range(max_depth):
+                    await cursor.execute(self.get_traverse_step_sql(references[depth % len(references)]), (frontier,))
+                    frontier = self.expand_traverse_frontier([row[0] for row in await cursor.fetchall()], depth, references, visited, reached)
+                    if len(frontier) == 0:
+                        break
+                for target_class, depths in reached.items():
+                    if len(depths) == 0:
+                        continue
+                    sql, values = self.get_traverse_objects_sql(target_class, enforce_permissions)
+                    await cursor.execute(sql, (list(depths), *values))
+                    cols = [d[0] for d in cursor.description]
+                    for row in await cursor.fetchall():
+                        object_ = self.build_object(target_class, dict(zip(cols, row)))
+                        result.append((depths[object_.id], object_, None))
+        result.sort(key=lambda r: r[0])
+        return [(object_, path) for _, object_, path in result] if with_paths else [object_ for _, object_, _ in result]
+
+    ################################################## Berechtigungen ##################################################
+    @instrumented
+    async def create_group(self, name: str, parent: Group = None) -> Group:
+        """ Erstellt eine neue Benutzergruppe mit dem übergebenen Namen und gibt ein Group-Objekt zurück """
+        async with self.transaction() as connection:
+            if parent:
+                cursor = await connection.execute('INSERT INTO permission.group (name, parent_id) VALUES (%s, %s) RETURNING id', (name, parent.id))
+            else:
+                cursor = await connection.execute('INSERT INTO permission.group (name) VALUES (%s) RETURNING id', (name,))
+            id = (await cursor.fetchone())[0]
+        return Group(self, id, name, parent.id if parent else None)
+
+    @instrumented
+    async def add_user_to_group(self, user: User, group: Group):
+        """ Weist den übergebenen Benutzer der übergebenen Benutzergruppe zu """
+        async with self.transaction() as connection:
+            await connection.execute('INSERT INTO permission.user_assignment (user_id, group_id) VALUES (%s, %s)', (user.id, group.id))
+
+    @instrumented
+    async def assign_class_to_group(self, class_: Class, group: Group, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
+        """ Weist die übergeben Klasse der übergebenen Benutzergruppe zu """
+        async with self.transaction() as connection:
+            await connection.execute('INSERT INTO permission.class_assignment (class_id, group_id, "read", write, "delete", administration) VALUES (%s, %s, %s, %s, %s, %s)', (class_.id, group.id, read, write, delete, administration))
+
+    @instrumented
+    async def assign_object_to_group(self, object: Object, group: Group, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
+        """ Weist das übergebene Object der übergebenen Benutzergruppe zu """
+        async with self.transaction() as connection:
+            await connection.execute('INSERT INTO permission.object_assignment (object_id, group_id, "read", write, "delete", administration) VALUES (%s, %s, %s, %s, %s, %s)', (object.id, group.id, read, write, delete, administration))
+
+    @instrumented
+    async def assign_reference_to_group(self, reference: Reference, group: Group, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
+        """ Weist die übergeben Referenz der übergebenen Benutzergruppe zu """
+        async with self.transaction() as connection:
+            await connection.execute('INSERT INTO permission.reference_assignment (reference_id, group_id, "read", write, "delete", administration) VALUES (%s, %s, %s, %s, %s, %s)', (reference.id, group.id, read, write, delete, administration))
+
+    @instrumented
+    async def get_users_groups_from_db(self, user: User):
+        """ Gibt die dem Benutzer zugewiesenen Gruppen sowie die untergeordneten Gruppen mittels Datenbankabfrage zurück """
+        async with self.transaction() as connection:
+            cursor = await connection.execute(USER_GROUPS_QUERY, (user.id,))
+            rows = await cursor.fetchall()
+        return [Group(self, row[0], row[1], row[2]) for row in rows]
+
+    @instrumented
+    async def get_users_classes_from_db(self, user: User):
+        """ Gibt die dem Benutzer über Gruppen zugewiesenen Objektklassen zurück """
+        async with self.transaction() as connection:
+            cursor = await connection.execute(USER_CLASSES_QUERY, (user.id,))
+            rows = await cursor.fetchall()
+        return [self.get_class_by_id(row[0]) for row in rows]
+
+    @instrumented
+    async def load_permissions_from_db(self, user: User) -> PermissionCache:
+        """ Ermittelt die effektiven Klassen-, Referenz- und Objektrechte des Benutzers über die Gruppenhierarchie in einer Abfrage """
+        async with self.transaction() as connection:
+            cursor = await connection.execute(EFFECTIVE_PERMISSIONS_QUERY, (user.id,))
+            rows = await cursor.fetchall()
+        permission_cache = PermissionCache(self.permission_ttl)
+        for row in rows:
+            permission_cache.store_permissions(row[0], row[1], row[2], row[3])
+        return permission_cache
+
+    async def get_permissions(self) -> PermissionCache:
+        """ Gibt die effektiven Rechte des Benutzers der Schnittstelle zurück, nach Ablauf der Lebensdauer werden sie neu geladen """
+        if self.permission_cache is None or self.permission_cache.is_expired():
+            self.permission_cache = await self.load_permissions_from_db(self.user)
+        return self.permission_cache
+
+    async def check_class_permission(self, class_: Class, permission: int = PERMISSION_READ) -> bool:
+        """ Gibt zurück, ob der Benutzer die Rechte der übergebenen Bitmaske auf die Klasse besitzt """
+        return (await self.get_permissions()).allows_class(class_.id, permission)
+
+    async def check_reference_permission(self, reference: Reference, permission: int = PERMISSION_READ) -> bool:
+        """ Gibt zurück, ob der Benutzer die Rechte der übergebenen Bitmaske auf die Referenz besitzt """
+        return (await self.get_permissions()).allows_reference(reference.id, permission)
+
+    async def check_object_permission(self, object_: Object, permission: int = PERMISSION_READ) -> bool:
+        """ Gibt zurück, ob der Benutzer die Rechte der übergebenen Bitmaske auf das Objekt besitzt, Klassenrechte gelten für alle Objekte der Klasse """
+        return (await self.get_permissions()).allows_object(object_.id, object_.get_class().id, permission)
+
+def sync_only(name: str):
+    """ Erzeugt eine Methode, die eine von UserInterface geerbte synchrone Methode ohne asynchrone Variante mit einem TypeError ablehnt """
+
+    def method(self, *args, **kwargs):
+        raise TypeError(f'{name}() ist in AsyncUserInterface nicht verfügbar, nur in der synchronen UserInterface')
+    method.__name__ = name
+    return method
+
+# Geerbte Methoden mit threadgebundener Verbindungsverwaltung (cursor(), Sessions, Replikate, Strukturbenachrichtigungen) bzw. ohne asynchrone Variante
+SYNC_ONLY_METHODS = (
+    'checkout', 'connect', 'commit', 'rollback', 'disconnect', 'cursor',
+    'get_pending_objects', 'publish_pending_objects', 'get_session', 'session', 'migration',
+    'is_sticky', 'use_replica', 'connect_replica', 'mark_replica_failed', 'fail_replica', 'disconnect_replica', 'get_read_connection',
+    'listen_structure_changes', 'stop_listening_structure_changes', 'process_structure_changes', 'reload_structure',
+    'insert_objects', 'update_objects',
+    'get_structure_definition', 'export_snapshot', 'write_export', 'export_data', 'export_class', 'export_schema',
+    'apply_structure_definition', 'import_data', 'import_class', 'import_schema'
+)
+for name in SYNC_ONLY_METHODS:
+    setattr(AsyncUserInterface, name, sync_only(name))
+for name in ('current_connection', 'replica_connection'):
+    setattr(AsyncUserInterface, name, property(sync_only(name)))
@@ -1,9 +1,20 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from control import Class, Attribute, Reference, Object, Group
 
+PERMISSION_READ = 1
+PERMISSION_WRITE = 2
+PERMISSION_DELETE = 4
+PERMISSION_ADMINISTRATION = 8
+
 class DictCache:
     def __init__(self, *atts):
         self.atts = atts
         self.dicts = {}
+        self.hits = 0
+        self.misses = 0
         self.setup()
 
     def setup(self):
@@ -24,17 +35,138 @@ class DictCache:
 
     def get(self, attr, value):
         """ Gibt ein Element anhand des übergebenen Attribut-Wert-Paares zurück """
-        return self.dicts[attr].get(value)
+        element = self.dicts[attr].get(value)
+        if element is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return element
 
     def contains(self, attr, value) -> bool:
         """ Gibt zurück, ein Element mit dem übergebenen Attribut-Wert-Paares vorhanden ist """
         return value in self.dicts[attr]
 
+    def remove(self, element) -> None:
+        """ Entfernt ein Element aus den Dictionaries """
+        for a in self.atts:
+            self.dicts[a].pop(getattr(element, a), None)
+
+    def values(self) -> list:
+        """ Gibt alle abgelegten Elemente zurück """
+        return list(self.dicts[self.atts[0]].values())
+
+    def get_statistics(self) -> dict:
+        """ Gibt Treffer, Fehlzugriffe und aktuelle Größe zurück """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.dicts[self.atts[0]])}
+
+class StatementCache:
+    def __init__(self) -> None:
+        self.statements = {}
+        self.prepared = weakref.WeakKeyDictionary()
+        self.outdated = weakref.WeakSet()
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> tuple:
+        """ Gibt Name und SQL der zum Schlüssel gehörigen Anweisung zurück """
+        return self.statements.get(key)
+
+    def store(self, key: tuple, sql: str) -> tuple:
+        """ Legt eine Anweisung unter einem neuen, eindeutigen Namen ab und gibt Name und SQL zurück """
+        with self.lock:
+            self.counter += 1
+            statement = (f'sqlobint_{self.counter}', sql)
+            self.statements[key] = statement
+        return statement
+
+    def is_prepared(self, connection, name: str) -> bool:
+        """ Gibt zurück, ob die Anweisung auf der Datenbankverbindung bereits vorbereitet wurde """
+        return name in self.prepared.get(connection, ())
+
+    def mark_prepared(self, connection, name: str) -> None:
+        """ Vermerkt die Anweisung als auf der Datenbankverbindung vorbereitet, Einträge geschlossener Verbindungen werden dabei verworfen """
+        with self.lock:
+            for closed_connection in [c for c in self.prepared.keys() if c.closed]:
+                del self.prepared[closed_connection]
+            self.prepared.setdefault(connection, set()).add(name)
+
+    def is_outdated(self, connection) -> bool:
+        """ Gibt zurück, ob auf der Datenbankverbindung noch verworfene Anweisungen vorbereitet sind """
+        return connection in self.outdated
+
+    def mark_deallocated(self, connection) -> None:
+        """ Vermerkt, dass auf der Datenbankverbindung alle vorbereiteten Anweisungen entfernt wurden (DEALLOCATE ALL) """
+        with self.lock:
+            self.outdated.discard(connection)
+            self.prepared.pop(connection, None)
+
+    def clear(self) -> None:
+        """ Verwirft alle Anweisungen, neue Anweisungen erhalten neue Namen, die bereits vorbereiteten werden vor der nächsten Vorbereitung je Verbindung entfernt """
+        with self.lock:
+            self.statements.clear()
+            self.outdated.update(self.prepared.keys())
+            self.prepared.clear()
+
 class StructureCache:
     def __init__(self) -> None:
         self.class_cache = DictCache('id', 'name')
         self.attribute_cache = DictCache('id', 'name')
         self.reference_cache = DictCache('id', 'name')
+        self.statement_cache = StatementCache()
+        self.version = 0
+
+    def is_gap(self, version: int) -> bool:
+        """ Gibt zurück, ob zwischen der zuletzt gesehenen und der übergebenen Version Strukturänderungen fehlen """
+        return version > self.version + 1
+
+    def reset(self) -> None:
+        """ Verwirft alle Klassen, Attribute, Referenzen und generierten Anweisungen, z.B. nach verpassten Strukturänderungen """
+        for cache in (self.class_cache, self.attribute_cache, self.reference_cache):
+            cache.setup()
+        self.statement_cache.clear()
+
+    def invalidate(self, kind: str, id: str, version: int) -> None:
+        """ Verwirft die von einer Strukturänderung betroffenen Einträge, kind ist 'class', 'attribute', 'attribute_assignment' oder 'reference' """
+        self.version = max(self.version, version)
+        if kind != 'reference':
+            self.reset_derived()
+        if kind == 'class':
+            class_ = self.class_cache.get('id', id)
+            if class_:
+                self.class_cache.remove(class_)
+                for c in self.class_cache.values():
+                    c.family_tree = None
+        elif kind == 'attribute':
+            attribute = self.attribute_cache.get('id', id)
+            if attribute:
+                self.attribute_cache.remove(attribute)
+                for c in self.class_cache.values():
+                    if c.assigned_attributes is not None and attribute in c.assigned_attributes:
+                        c.assigned_attributes = None
+        elif kind == 'attribute_assignment':
+            class_ = self.class_cache.get('id', id)
+            if class_:
+                class_.assigned_attributes = None
+        elif kind == 'reference':
+            reference = self.reference_cache.get('id', id)
+            if reference:
+                self.reference_cache.remove(reference)
+
+    def get_statistics(self) -> dict:
+        """ Gibt die Statistiken der Klassen-, Attribut- und Referenzcaches sowie die Anzahl generierter Anweisungen zurück """
+        return {
+            'class': self.class_cache.get_statistics(),
+            'attribute': self.attribute_cache.get_statistics(),
+            'reference': self.reference_cache.get_statistics(),
+            'statements': len(self.statement_cache.statements),
+            'version': self.version
+        }
+
+    def reset_derived(self) -> None:
+        """ Verwirft aus der Struktur abgeleitete Daten (Attributpositionen, generierte Anweisungen), bereits erzeugte Objekte behalten ihre Zuordnung """
+        for class_ in self.class_cache.values():
+            class_.layout = None
+        self.statement_cache.clear()
 
     def store_class(self, class_: Class) -> None:
         """ Fügt ein Klassenobjekt hinzu """
@@ -73,18 +205,88 @@ class StructureCache:
         return self.reference_cache.contains(attr, value)
 
 class PermissionDefinition:
+    __slots__ = ('mask',)
+
     def __init__(self, read: bool, write: bool, delete: bool, administration: bool) -> None:
-        self.read = read
-        self.write = write
-        self.delete = delete
-        self.administration = administration
+        self.mask = (PERMISSION_READ if read else 0) | (PERMISSION_WRITE if write else 0) | (PERMISSION_DELETE if delete else 0) | (PERMISSION_ADMINISTRATION if administration else 0)
+
+    @classmethod
+    def from_mask(cls, mask: int):
+        """ Erzeugt eine Berechtigungsdefinition aus einer Bitmaske """
+        definition = cls.__new__(cls)
+        definition.mask = mask
+        return definition
+
+    def allows(self, permission: int) -> bool:
+        """ Gibt zurück, ob alle Rechte der übergebenen Bitmaske gewährt sind """
+        return self.mask & permission == permission
+
+    @property
+    def read(self) -> bool:
+        return bool(self.mask & PERMISSION_READ)
+
+    @property
+    def write(self) -> bool:
+        return bool(self.mask & PERMISSION_WRITE)
+
+    @property
+    def delete(self) -> bool:
+        return bool(self.mask & PERMISSION_DELETE)
+
+    @property
+    def administration(self) -> bool:
+        return bool(self.mask & PERMISSION_ADMINISTRATION)
         
 class PermissionCache:
-    def __init__(self) -> None:
+    def __init__(self, ttl: float = None) -> None:
+        self.ttl = ttl
         self.group_cache = DictCache('id', 'name')
         self.class_cache = DictCache('id', 'name')
         self.reference_cache = DictCache('id', 'name')
         self.object_cache = DictCache('id')
+        self.loaded = time.monotonic()
+
+    def clear(self) -> None:
+        """ Leert alle Dictionaries und setzt den Ladezeitpunkt zurück """
+        for cache in (self.group_cache, self.class_cache, self.reference_cache, self.object_cache):
+            cache.setup()
+        self.loaded = time.monotonic()
+
+    def is_expired(self) -> bool:
+        """ Gibt zurück, ob die Lebensdauer der zwischengespeicherten Berechtigungen abgelaufen ist """
+        return self.ttl is not None and time.monotonic() - self.loaded > self.ttl
+
+    def get_statistics(self) -> dict:
+        """ Gibt die Statistiken der Klassen-, Referenz- und Objektrechte sowie das Alter der Berechtigungen zurück """
+        return {
+            'class': self.class_cache.get_statistics(),
+            'reference': self.reference_cache.get_statistics(),
+            'object': self.object_cache.get_statistics(),
+            'age': time.monotonic() - self.loaded
+        }
+
+    def store_permissions(self, kind: str, id: str, name: str, mask: int) -> None:
+        """ Fügt die Berechtigungsdefinition eines Elements ('class', 'reference' oder 'object') als Bitmaske hinzu """
+        cache = {'class': self.class_cache, 'reference': self.reference_cache, 'object': self.object_cache}[kind]
+        cache.store_custom(PermissionDefinition.from_mask(mask), id=id, name=name)
+
+    def allows_class(self, class_id: str, permission: int) -> bool:
+        """ Gibt zurück, ob alle Rechte der Bitmaske auf die Klasse gewährt sind """
+        definition = self.class_cache.get('id', class_id)
+        return definition is not None and definition.allows(permission)
+
+    def allows_reference(self, reference_id: str, permission: int) -> bool:
+        """ Gibt zurück, ob alle Rechte der Bitmaske auf die Referenz gewährt sind """
+        definition = self.reference_cache.get('id', reference_id)
+        return definition is not None and definition.allows(permission)
+
+    def allows_object(self, object_id: str, class_id: str, permission: int) -> bool:
+        """ Gibt zurück, ob alle Rechte der Bitmaske auf das Objekt gewährt sind, Klassenrechte gelten für alle Objekte der Klasse """
+        mask = 0
+        for definition in (self.object_cache.get('id', object_id), self.class_cache.get('id', class_id)):
+            if definition is not None:
+                mask |= definition.mask
+        return mask & permission == permission
 
     def store_group(self, group: Group) -> None:
         """ Fügt eine Benutzergruppe hinzu """
@@ -144,3 +346,58 @@ class PermissionCache:
     def contains_object_permissions(self, id) -> bool:
         """ Gibt anhand der id zurück, ob die Berechtigungsdefinition des Objekts im Cache vorhanden ist """
         return self.object_cache.contains('id', id)
+
+class ObjectCache:
+    def __init__(self, max_size: int = 10000, ttl: float = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def store(self, object_: Object) -> None:
+        """ Legt ein Objekt ab und verdrängt bei Überschreiten der Maximalgröße das am längsten nicht genutzte Objekt """
+        with self.lock:
+            self.entries[object_.id] = (time.monotonic(), object_)
+            self.entries.move_to_end(object_.id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, id) -> Object:
+        """ Gibt ein Objekt anhand dessen ID zurück, abgelaufene Einträge werden verworfen """
+        with self.lock:
+            entry = self.entries.get(id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[id]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(id)
+            self.hits += 1
+            return entry[1]
+
+    def remove(self, id) -> None:
+        """ Entfernt ein Objekt anhand dessen ID """
+        with self.lock:
+            self.entries.pop(id, None)
+
+    def remove_where(self, condition) -> None:
+        """ Entfernt alle Objekte, für die condition(Objekt) zutrifft """
+        with self.lock:
+            for id in [id for id, (_, object_) in self.entries.items() if condition(object_)]:
+                del self.entries[id]
+
+    def clear(self) -> None:
+        """ Entfernt alle Objekte """
+        with self.lock:
+            self.entries.clear()
+
+    def get_statistics(self) -> dict:
+        """ Gibt Treffer, Fehlzugriffe, Verdrängungen und aktuelle Größe zurück """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.entries)}
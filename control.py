@@ -1,14 +1,26 @@
+from exception import AttributeNotExists
+
+MISSING = object()
+
 class User:
+    __slots__ = ('id',)
+
     def __init__(self, id: str):
         self.id = id
 
 class Class:
-    def __init__(self, interface, id: str, name: str, parent_id: str) -> None:
+    __slots__ = ('interface', 'id', 'name', 'parent_id', 'view_mode', 'partitions', 'assigned_attributes', 'family_tree', 'layout')
+
+    def __init__(self, interface, id: str, name: str, parent_id: str, view_mode: str = 'view', partitions: int = None) -> None:
         self.interface = interface
         self.id = id
         self.name = name
         self.parent_id = parent_id
+        self.view_mode = view_mode
+        self.partitions = partitions
         self.assigned_attributes = None
+        self.family_tree = None
+        self.layout = None
         interface.structure_cache.store_class(self)
 
     def get_parent(self):
@@ -17,19 +29,26 @@ class Class:
 
     def get_family_tree(self) -> list:
         """ Gibt den Stammbaum der Klasse (alle übergeordneten Klassen und sich selbst) zurück """
-        if self.is_root():
-          return [self]
-        else:
-          family_tree = self.get_parent().get_family_tree()
-          family_tree.append(self)
-          return family_tree
+        if self.family_tree is None:
+            if self.is_root():
+                self.family_tree = [self]
+            else:
+                self.family_tree = [*self.get_parent().get_family_tree(), self]
+        return list(self.family_tree)
 
     def get_assigned_attributes(self):
         """ Gibt die der Klasse direkt zugewiesenen Attribute zurück """
-        if not self.assigned_attributes:
+        if self.assigned_attributes is None:
             self.assigned_attributes = self.interface.get_assigned_attributes_from_db(self)
         return self.assigned_attributes
 
+    def get_layout(self) -> dict:
+        """ Gibt die von allen Objekten der Klasse geteilte Zuordnung von Attributnamen zu Positionen zurück """
+        if self.layout is None:
+            names = [a.name for c in self.get_family_tree() for a in c.get_assigned_attributes()]
+            self.layout = {name: i for i, name in enumerate(names)}
+        return self.layout
+
     def is_root(self):
         """ Gibt zurück, ob die Klasse eine Ursprungsklasse ist (keine Vorfahren hat) """
         return self.parent_id is None
@@ -40,10 +59,16 @@ class Class:
 
     def update_view(self):
         """ Erstellt oder aktualisiert in der Datenbank eine View zum Anzeigen aller Objekte der Klasse """
-        self.interface.update_class_view(self)
+        return self.interface.update_class_view(self)
+
+    def refresh_view(self, ids: list = None, concurrently: bool = True):
+        """ Aktualisiert die Daten einer materialisierten bzw. denormalisierten View der Klasse, optional nur für die übergebenen Objekt-IDs """
+        return self.interface.refresh_class_view(self, ids, concurrently)
 
 
 class Attribute:
+    __slots__ = ('interface', 'id', 'name', 'generator', 'indexed')
+
     def __init__(self, interface, id: str, name: str, generator: str, indexed: bool) -> None:
         self.interface = interface
         self.id = id
@@ -53,6 +78,8 @@ class Attribute:
         interface.structure_cache.store_attribute(self)
 
 class AttributeAssignment:
+    __slots__ = ('interface', 'class_id', 'attribute_id', 'nullable', 'default')
+
     def __init__(self, interface, class_id: str, attribute_id: str, nullable: bool, default: str):
         self.interface = interface
         self.class_id = class_id
@@ -69,6 +96,8 @@ class AttributeAssignment:
         return self.interface.get_attribute_by_id(self.attribute_id)
 
 class Reference:
+    __slots__ = ('interface', 'id', 'name', 'origin_class_id', 'target_class_id')
+
     def __init__(self, interface, id: str, name: str, origin_class_id: str, target_class_id: str) -> None:
         self.interface = interface
         self.id = id
@@ -86,11 +115,41 @@ class Reference:
         return self.interface.get_class_by_id(self.target_class_id)
 
 class Object:
+    __slots__ = ('interface', 'id', 'class_', 'layout', 'values')
+
     def __init__(self, interface, id: str, class_: Class, **attributes):
         self.interface = interface
         self.id = id
         self.class_ = class_
-        self.attributes = attributes
+        self.layout = class_.get_layout()
+        self.check_attributes(attributes)
+        self.values = tuple(attributes.get(name, MISSING) for name in self.layout)
+
+    @property
+    def attributes(self) -> dict:
+        """ Gibt die gesetzten Attribute des Objekts als Dictionary zurück """
+        return {name: self.values[i] for name, i in self.layout.items() if self.values[i] is not MISSING}
+
+    def get_value(self, name: str):
+        """ Gibt den Wert des übergebenen Attributs zurück, None falls nicht gesetzt """
+        i = self.layout.get(name)
+        if i is None or self.values[i] is MISSING:
+            return None
+        return self.values[i]
+
+    def check_attributes(self, attributes: dict):
+        """ Löst AttributeNotExists für das erste Attribut aus, das nicht im Layout der Klasse enthalten ist """
+        for name in attributes:
+            if name not in self.layout:
+                raise AttributeNotExists(name)
+
+    def set_values(self, **attributes):
+        """ Setzt die übergebenen Attributwerte ohne Datenbankzugriff """
+        self.check_attributes(attributes)
+        values = list(self.values)
+        for name, value in attributes.items():
+            values[self.layout[name]] = value
+        self.values = tuple(values)
 
     def get_class(self) -> Class:
         """ Gibt die Klasse des Objekts zurück """
@@ -98,7 +157,7 @@ class Object:
 
     def modify(self, **attributes):
         """ Aktualisiert die übergebenen Attribute """
-        self.interface.modify(self, **attributes)
+        return self.interface.modify(self, **attributes)
 
     def dump(self):
         """ Gibt String mit allen Objekteigenschaften zurück """
@@ -106,6 +165,8 @@ class Object:
         return f'{self.class_.name} {self.id}:\n  {str_attributes}'
     
 class Group:
+    __slots__ = ('interface', 'id', 'name', 'parent_id')
+
     def __init__(self, interface, id: str, name: str, parent_id: str) -> None:
         self.interface = interface
         self.id = id
@@ -114,16 +175,16 @@ class Group:
 
     def add_user(self, user: User):
         """ Weist den übergebenen Benutzer der Benutzergruppe zu """
-        self.interface.add_user_to_group(user, self)
+        return self.interface.add_user_to_group(user, self)
 
     def assign_class(self, class_: Class, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
         """ Weist das übergebene Klasse der Benutzergruppe zu """
-        self.interface.assign_class_to_group(class_, self, read, write, delete, administration)
+        return self.interface.assign_class_to_group(class_, self, read, write, delete, administration)
 
     def assign_object(self, object: Object, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
         """ Weist das übergebene Object der Benutzergruppe zu """
-        self.interface.assign_object_to_group(object, self, read, write, delete, administration)
+        return self.interface.assign_object_to_group(object, self, read, write, delete, administration)
 
     def assign_reference(self, reference: Reference, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
         """ Weist die übergeben Assoziation der Benutzergruppe zu """
-        self.interface.assign_reference_to_group(reference, self, read, write, delete, administration)
\ No newline at end of file
+        return self.interface.assign_reference_to_group(reference, self, read, write, delete, administration)
\ No newline at end of file
@@ -0,0 +1,258 @@
+# Add parent directory to system path
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+# Imports
+import argparse
+import configparser
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timezone
+import psycopg2.pool
+from interface import UserInterface, setup_db
+from metrics import Metrics
+
+
+def get_connection_pool(filename_config: str):
+    config = configparser.ConfigParser()
+    config.read(filename_config)
+    return psycopg2.pool.ThreadedConnectionPool(1, 4,
+                                                host=config.get('Database', 'host'),
+                                                user=config.get('Database', 'user'),
+                                                password=config.get('Database', 'password'),
+                                                database=config.get('Database', 'database'))
+
+
+def get_revision():
+    """ Gibt den aktuellen Git-Commit zurück, None außerhalb eines Repositories """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=parent, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(operations: int, seconds: float, latencies: list = None) -> dict:
+    """ Fasst Anzahl, Dauer, Durchsatz und ggf. Latenzperzentile (in Millisekunden) eines Workloads zusammen """
+    result = {'operations': operations, 'seconds': seconds, 'ops_per_second': operations / seconds if seconds > 0 else None}
+    if latencies and len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        result['latency_ms'] = {
+            'mean': statistics.fmean(latencies) * 1000,
+            'p50': percentiles[49] * 1000,
+            'p95': percentiles[94] * 1000,
+            'p99': percentiles[98] * 1000,
+            'max': max(latencies) * 1000
+        }
+    return result
+
+
+def measure(function, arguments: list) -> dict:
+    """ Ruft die Funktion je Argument einmal auf und misst die Einzellatenzen """
+    latencies = []
+    begin = time.perf_counter()
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - start)
+    return summarize(len(arguments), time.perf_counter() - begin, latencies)
+
+
+def measure_once(function, operations: int) -> dict:
+    """ Ruft die Funktion einmal auf und rechnet die Dauer auf die übergebene Anzahl Operationen um """
+    begin = time.perf_counter()
+    function()
+    return summarize(operations, time.perf_counter() - begin)
+
+
+def setup_schema(interface: UserInterface, depth: int, partitions: int = None):
+    """ Legt das Schema aus examples/test.py an, person und address erben über depth - 1 Zwischenklassen von object, mit partitions werden alle Klassentabellen hash-partitioniert """
+    c_object = interface.create_class('object', partitions=partitions)
+    interface.assign_attribute(interface.create_attribute('created', 'TIMESTAMPTZ', True), c_object, False, 'CURRENT_TIMESTAMP')
+    interface.assign_attribute(interface.create_attribute('tag', 'VARCHAR(100)', False), c_object, True)
+
+    # Zwischenklassen für tiefere Stammbäume
+    c_parent = c_object
+    for level in range(1, depth):
+        c_parent = interface.create_class(f'level_{level}', c_parent, partitions)
+        interface.assign_attribute(interface.create_attribute(f'level_{level}_tag', 'VARCHAR(100)', False), c_parent, True)
+
+    c_person = interface.create_class('person', c_parent, partitions)
+    c_address = interface.create_class('address', c_parent, partitions)
+    interface.assign_attribute(interface.create_attribute('first_name', 'VARCHAR(100)', False), c_person, False)
+    interface.assign_attribute(interface.create_attribute('last_name', 'VARCHAR(100)', False), c_person, False)
+    interface.assign_attribute(interface.create_attribute('birthday', 'DATE', True), c_person, False, "'01.01.1900'")
+    interface.assign_attribute(interface.create_attribute('street', 'VARCHAR(100)', False), c_address, False)
+    interface.assign_attribute(interface.create_attribute('house_number', 'VARCHAR(8)', False), c_address, False)
+    interface.assign_attribute(interface.create_attribute('postal_code', 'VARCHAR(5)', False), c_address, False)
+    interface.assign_attribute(interface.create_attribute('city', 'VARCHAR(100)', False), c_address, False)
+
+    for class_ in c_person.get_family_tree():
+        class_.update_view()
+    c_address.update_view()
+    interface.create_reference('person_to_address', c_person, c_address)
+    return c_person, c_address
+
+
+class DataGenerator:
+    def __init__(self, seed: int) -> None:
+        self.random = random.Random(seed)
+        with open(os.path.join(current, 'data', 'sample_first_names.txt'), 'r') as file:
+            self.first_names = [name.strip() for name in file.readlines()]
+        with open(os.path.join(current, 'data', 'sample_last_names.txt'), 'r') as file:
+            self.last_names = [name.strip() for name in file.readlines()]
+        self.all_names = [*self.first_names, *self.last_names]
+
+    def person(self, i: int) -> dict:
+        """ Erzeugt die Attribute einer Person wie in examples/test.py """
+        return {'tag': f'Person {i}',
+                'first_name': self.random.choice(self.first_names),
+                'last_name': self.random.choice(self.last_names),
+                'birthday': date(self.random.randint(1930, 2005), self.random.randint(1, 12), self.random.randint(1, 28))}
+
+    def address(self, i: int) -> dict:
+        """ Erzeugt die Attribute einer Adresse wie in examples/test.py """
+        return {'tag': f'Adresse {i}',
+                'street': f"{self.random.choice(self.all_names)}{self.random.choice(['straße', 'weg'])}",
+                'house_number': f"{self.random.randint(1, 100)}{self.random.choice(['a', 'b', 'c', 'd', 'e', 'f']) if self.random.random() < 0.1 else ''}",
+                'postal_code': f"{self.random.randint(10000, 99999)}",
+                'city': f"{self.random.choice(self.all_names)}{self.random.choice(['stadt', 'dorf', 'ingen', 'heim'])}"}
+
+
+def load_data(interface: UserInterface, generator: DataGenerator, c_person, c_address, n_objects: int, fanout: int, batch_size: int) -> tuple:
+    """ Erzeugt n_objects Objekte (je Person fanout Adressen) blockweise und verbindet sie, gibt Stichproben der IDs sowie die Messwerte zurück """
+    n_persons = max(1, n_objects // (1 + fanout))
+    person_ids, address_ids = [], []
+    seconds_create, seconds_bind = 0.0, 0.0
+    for start in range(0, n_persons, batch_size):
+        count = min(batch_size, n_persons - start)
+        with interface.transaction():
+            begin = time.perf_counter()
+            persons = interface.create_objects(c_person, [generator.person(i) for i in range(start, start + count)], batch_size)
+            addresses = interface.create_objects(c_address, [generator.address(i) for i in range(start * fanout, (start + count) * fanout)], batch_size)
+            seconds_create += time.perf_counter() - begin
+
+            begin = time.perf_counter()
+            interface.bind_many([(person, addresses[k * fanout + f]) for k, person in enumerate(persons) for f in range(fanout)], 'person_to_address')
+            seconds_bind += time.perf_counter() - begin
+
+        # Nur IDs behalten, damit auch große Datenmengen nicht im Speicher gehalten werden
+        person_ids.extend(p.id for p in persons[:max(1, count // 10)])
+        address_ids.extend(a.id for a in addresses[:max(1, count // 10)])
+    results = {
+        'create_objects': summarize(n_persons * (1 + fanout), seconds_create),
+        'bind_many': summarize(n_persons * fanout, seconds_bind)
+    }
+    return person_ids, address_ids, results
+
+
+def run_benchmark(interface: UserInterface, args) -> dict:
+    generator = DataGenerator(args.seed)
+    sampler = random.Random(args.seed)
+    results = {}
+
+    # Schema und Daten
+    with interface.transaction():
+        c_person, c_address = setup_schema(interface, args.depth, args.partitions)
+    person_ids, address_ids, load_results = load_data(interface, generator, c_person, c_address, args.objects, args.fanout, args.batch_size)
+    results.update(load_results)
+    person_sample = [sampler.choice(person_ids) for _ in range(args.samples)]
+
+    # Einzelzugriffe
+    with interface.transaction():
+        results['create_object'] = measure(lambda i: interface.create_object(c_person, **generator.person(i)), list(range(args.samples)))
+    with interface.transaction():
+        results['get_object'] = measure(lambda id: interface.get_object(id, c_person), person_sample)
+    with interface.transaction():
+        persons = [interface.get_object(id, c_person) for id in person_sample]
+    with interface.transaction():
+        results['modify'] = measure(lambda person: person.modify(first_name=generator.random.choice(generator.first_names)), persons)
+    with interface.transaction():
+        results['update_objects'] = measure_once(lambda: interface.update_objects([(p, {'last_name': generator.random.choice(generator.last_names)}) for p in persons], args.batch_size), len(persons))
+    with interface.transaction():
+        addresses = [interface.get_object(sampler.choice(address_ids), c_address) for _ in range(args.samples)]
+        results['bind'] = measure(lambda pair: interface.bind(pair[0], pair[1], 'person_to_address', rebind=True), list(zip(persons, addresses)))
+
+    # Referenzen
+    with interface.transaction():
+        results['hop'] = measure(lambda person: interface.hop(person, 'person_to_address'), persons)
+        results['hop_many'] = measure_once(lambda: interface.hop_many(persons, 'person_to_address'), len(persons))
+        results['reverse_hop'] = measure(lambda address: interface.reverse_hop(address, 'person_to_address'), addresses)
+
+    # Views
+    with interface.transaction():
+        results['view_materialize'] = measure_once(lambda: interface.set_class_view_mode(c_person, 'materialized'), 1)
+    with interface.transaction():
+        results['view_refresh'] = measure_once(lambda: interface.refresh_class_view(c_person), 1)
+    with interface.transaction():
+        results['view_get_object_materialized'] = measure(lambda id: interface.get_object(id, c_person), person_sample)
+        interface.set_class_view_mode(c_person, 'view')
+
+    # Berechtigungen
+    with interface.transaction():
+        group = interface.create_group('benchmark')
+        interface.add_user_to_group(interface.user, group)
+        interface.assign_class_to_group(c_address, group, read=True)
+        for person in persons[::2]:
+            interface.assign_object_to_group(person, group, read=True)
+    with interface.transaction():
+        results['load_permissions'] = measure(lambda _: interface.load_permissions_from_db(interface.user), list(range(min(args.samples, 100))))
+        results['check_object_permission'] = measure(lambda person: interface.check_object_permission(person), persons)
+        results['get_object_enforced'] = measure(lambda id: interface.get_object(id, c_person, enforce_permissions=True), person_sample)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark der UserInterface gegen eine lokale PostgreSQL-Datenbank, die Datenbank wird dabei geleert (setup_db)')
+    parser.add_argument('--config', default='examples/config.cfg', help='Konfiguration mit Abschnitt [Database]')
+    parser.add_argument('--objects', type=int, default=1000, help='Anzahl zu erzeugender Objekte (Personen und Adressen), z.B. 1000 bis 10000000')
+    parser.add_argument('--depth', type=int, default=1, help='Tiefe des Stammbaums unterhalb von object')
+    parser.add_argument('--fanout', type=int, default=1, help='Adressen je Person')
+    parser.add_argument('--partitions', type=int, help='Anzahl Hash-Partitionen für data.meta und alle Klassentabellen')
+    parser.add_argument('--samples', type=int, default=1000, help='Anzahl Einzeloperationen je Workload')
+    parser.add_argument('--batch-size', type=int, default=10000, help='Blockgröße beim Laden der Daten')
+    parser.add_argument('--seed', type=int, default=1902)
+    parser.add_argument('--output', help='Ausgabedatei für das JSON-Ergebnis, sonst stdout')
+    parser.add_argument('--metrics', action='store_true', help='Erfasst zusätzlich Anweisungen und Latenzen je Methode (verlangsamt die Messung leicht)')
+    parser.add_argument('--purge', action='store_true', help='Bestätigt, dass die konfigurierte Datenbank geleert werden darf')
+    args = parser.parse_args()
+    if not args.purge:
+        parser.error('the benchmark purges the configured database, confirm with --purge')
+    if args.depth < 1 or args.fanout < 1:
+        parser.error('--depth and --fanout must be at least 1')
+
+    pool = get_connection_pool(args.config)
+    connection = pool.getconn()
+    root_user = setup_db(connection, meta_partitions=args.partitions)
+    cursor = connection.cursor()
+    cursor.execute('SHOW server_version')
+    server_version = cursor.fetchone()[0]
+    pool.putconn(connection)
+
+    interface = UserInterface(root_user, pool, metrics=Metrics() if args.metrics else None)
+    started = datetime.now(timezone.utc)
+    results = run_benchmark(interface, args)
+    report = {
+        'meta': {
+            'started': started.isoformat(),
+            'revision': get_revision(),
+            'python': platform.python_version(),
+            'postgres': server_version,
+            'parameters': vars(args)
+        },
+        'results': results,
+        'metrics': interface.get_metrics()
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
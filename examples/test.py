@@ -77,7 +77,7 @@ def setup_test(interface: UserInterface, seed=1902):
                                             postal_code=f"{random.randint(10000, 99999)}",
                                             city=f"{random.choice(all_names)}{random.choice(['stadt', 'dorf', 'ingen', 'heim'])}", )
         addresses.append(o_address)
-        interface.bind(o_person, o_address, 'person_to_address')
+    interface.bind_many(list(zip(persons, addresses)), 'person_to_address')
 
     # Daten modifizieren
     persons[0].modify(first_name='Fred', last_name='Schlonz')
@@ -3,3 +3,9 @@ class AttributeNotExists(NameError):
 
 class ReferenceNotExists(NameError):
     pass
+
+class StructureNotLoaded(LookupError):
+    pass
+
+class MigrationError(RuntimeError):
+    pass
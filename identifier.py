@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+import os
+import threading
+import time
+import uuid
+
+class IdStrategy(ABC):
+    """ Erzeugt clientseitig die IDs neuer Objekte, eigene Strategien implementieren generate() """
+
+    @abstractmethod
+    def generate(self) -> str:
+        """ Gibt eine neue Objekt-ID zurück """
+
+    def generate_many(self, n: int) -> list:
+        """ Gibt n neue Objekt-IDs zurück """
+        return [self.generate() for _ in range(n)]
+
+class UUID4IdStrategy(IdStrategy):
+    """ Zufällige UUIDs (Version 4), entspricht uuid_generate_v4() der Datenbank """
+
+    def generate(self) -> str:
+        return str(uuid.uuid4())
+
+class UUID7IdStrategy(IdStrategy):
+    """ Zeitlich geordnete UUIDs (Version 7, RFC 9562): 48 Bit Millisekunden-Zeitstempel, 12 Bit Zähler für die Reihenfolge innerhalb einer Millisekunde, 62 Bit Zufall """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.last_timestamp = 0
+        self.counter = 0
+
+    def next_timestamp(self) -> tuple:
+        """ Gibt (Zeitstempel, Zähler) zurück, die auch bei gleicher oder rückläufiger Systemzeit streng monoton steigen """
+        timestamp = time.time_ns() // 1_000_000
+        with self.lock:
+            if timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+                self.counter = int.from_bytes(os.urandom(2), 'big') & 0x3ff
+            else:
+                self.counter += 1
+                if self.counter > 0xfff:
+                    # Zähler erschöpft: auf die nächste Millisekunde vorgreifen
+                    self.last_timestamp += 1
+                    self.counter = 0
+            return self.last_timestamp, self.counter
+
+    def generate(self) -> str:
+        timestamp, counter = self.next_timestamp()
+        random_bits = int.from_bytes(os.urandom(8), 'big') & 0x3fffffffffffffff
+        value = (timestamp & 0xffffffffffff) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random_bits
+        return str(uuid.UUID(int=value))
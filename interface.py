@@ -1,11 +1,95 @@
+import functools
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 import psycopg2
 import psycopg2.extras
 from psycopg2 import pool
 from control import Class, Attribute, Reference, AttributeAssignment, Object, User, Group
-from cache import StructureCache
+from session import Session
+from migration import Migration
+from cache import StructureCache, PermissionCache, ObjectCache, PERMISSION_READ
+from exception import AttributeNotExists
+from metrics import Metrics, InstrumentedCursor, InstrumentedRealDictCursor, instrumented
+from identifier import IdStrategy, UUID7IdStrategy
 
-def setup_db(connection, filename_init_script: str = 'setup/init.sql'):
-    """ Leeren und initialisiert die Datenbank, gibt Root-Benutzer zurück """
+STRUCTURE_CHANNEL = 'structure_changed'
+NULL_COPY_VALUE = '\\N'
+REFERENCE_PAIRS_TABLE_QUERY = 'CREATE TEMP TABLE IF NOT EXISTS reference_pairs (origin_id UUID NOT NULL, target_id UUID) ON COMMIT DELETE ROWS'
+
+# Vergleichsoperatoren für find(), Werte werden stets als Parameter übergeben
+FIND_OPERATORS = {
+    '=': '{} = %s',
+    '!=': '{} <> %s',
+    '<': '{} < %s',
+    '<=': '{} <= %s',
+    '>': '{} > %s',
+    '>=': '{} >= %s',
+    'in': '{} = ANY(%s)',
+    'not in': '{} <> ALL(%s)',
+    'between': '{} BETWEEN %s AND %s',
+    'like': '{} LIKE %s',
+    'ilike': '{} ILIKE %s',
+    'is null': '{} IS NULL',
+    'is not null': '{} IS NOT NULL'
+}
+
+# Rekursiver Teilausdruck c mit den IDs der dem Benutzer (Parameter) zugewiesenen Gruppen samt untergeordneter Gruppen, über group_parent_id indiziert
+USER_GROUP_IDS_CTE = """c AS (
+    SELECT ua.group_id AS id FROM permission.user_assignment AS ua
+    WHERE ua.user_id = %s
+    UNION
+    SELECT g.id
+    FROM permission.group AS g
+    JOIN c ON c.id = g.parent_id
+)"""
+
+# Dem Benutzer zugewiesene Gruppen samt untergeordneter Gruppen
+USER_GROUPS_QUERY = f"""
+WITH RECURSIVE {USER_GROUP_IDS_CTE}
+SELECT g.id, g.name, g.parent_id FROM permission.group AS g WHERE g.id IN (SELECT id FROM c);
+"""
+
+# Dem Benutzer über Gruppen zugewiesene Klassen
+USER_CLASSES_QUERY = f"""
+WITH RECURSIVE {USER_GROUP_IDS_CTE}
+SELECT DISTINCT class_id FROM permission.class_assignment WHERE group_id IN (SELECT id FROM c)
+"""
+
+# Effektive Rechte eines Benutzers über die Gruppenhierarchie als Bitmaske je Klasse, Referenz und Objekt
+EFFECTIVE_PERMISSIONS_QUERY = f"""
+WITH RECURSIVE {USER_GROUP_IDS_CTE}, p AS (
+    SELECT 'class' AS kind, ca.class_id AS id, ca."read", ca.write, ca."delete", ca.administration
+    FROM permission.class_assignment AS ca WHERE ca.group_id IN (SELECT id FROM c)
+    UNION ALL
+    SELECT 'reference', ra.reference_id, ra."read", ra.write, ra."delete", ra.administration
+    FROM permission.reference_assignment AS ra WHERE ra.group_id IN (SELECT id FROM c)
+    UNION ALL
+    SELECT 'object', oa.object_id, oa."read", oa.write, oa."delete", oa.administration
+    FROM permission.object_assignment AS oa WHERE oa.group_id IN (SELECT id FROM c)
+)
+SELECT p.kind, p.id, COALESCE(sc.name, sr.name),
+    MAX(CASE WHEN p."read" THEN 1 ELSE 0 END) | MAX(CASE WHEN p.write THEN 2 ELSE 0 END) |
+    MAX(CASE WHEN p."delete" THEN 4 ELSE 0 END) | MAX(CASE WHEN p.administration THEN 8 ELSE 0 END)
+FROM p
+LEFT JOIN structure.class AS sc ON p.kind = 'class' AND sc.id = p.id
+LEFT JOIN structure.reference AS sr ON p.kind = 'reference' AND sr.id = p.id
+GROUP BY p.kind, p.id, sc.name, sr.name
+"""
+
+# Auskommentierte Partitionierung von data.meta in init.sql, nur eine Partitionierung über id erhält den Primärschlüssel auf id für die Fremdschlüssel
+META_PARTITIONING_MARKER = '/* PARTITION BY HASH (id) */'
+
+def get_hash_partitions_sql(table: str, partitions: int) -> str:
+    """ Erzeugt die Anweisungen zum Anlegen der Hash-Partitionen einer nach id partitionierten Tabelle """
+    return '\n'.join([f'CREATE TABLE {table}_part_{i} PARTITION OF {table} FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i});' for i in range(partitions)])
+
+def setup_db(connection, filename_init_script: str = 'setup/init.sql', meta_partitions: int = None):
+    """ Leeren und initialisiert die Datenbank, gibt Root-Benutzer zurück, mit meta_partitions wird data.meta nach dem Hash der ID partitioniert """
     cursor = connection.cursor()
     cursor.execute("""
     DROP SCHEMA IF EXISTS permission CASCADE; 
@@ -14,8 +98,16 @@ def setup_db(connection, filename_init_script: str = 'setup/init.sql'):
     DROP SCHEMA IF EXISTS structure CASCADE;
     """)
     with open(filename_init_script, 'r') as file:
-        cursor.execute(file.read())
+        script = file.read()
+    if meta_partitions:
+        # Die in init.sql auskommentierte Partitionierung aktivieren, data.meta wird so nur an einer Stelle definiert
+        if META_PARTITIONING_MARKER not in script:
+            raise ValueError(f'{filename_init_script} enthält keine Markierung {META_PARTITIONING_MARKER} für die Partitionierung von data.meta')
+        script = script.replace(META_PARTITIONING_MARKER, 'PARTITION BY HASH (id)')
+    cursor.execute(script)
     root_user_id = cursor.fetchone()[0]
+    if meta_partitions:
+        cursor.execute(get_hash_partitions_sql('data.meta', meta_partitions))
     connection.commit()
     return User(root_user_id)
 
@@ -25,52 +117,395 @@ def get_user_by_name(connection, name: str) -> User:
     cursor.execute('SELECT id FROM permission.user WHERE name = %s', (name,))
     return User(cursor.fetchone()[0])
 
+def replica_fallback(method):
+    """ Wiederholt eine lesende Schnittstellenmethode auf dem Primärserver, falls das verwendete Replikat mit einem Verbindungsfehler ausfällt """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except psycopg2.OperationalError as error:
+            connection = self.replica_connection
+            if connection is None or not (connection.closed or getattr(error.cursor, 'connection', None) is connection):
+                raise
+            self.fail_replica()
+            self.local.primary_reads = True
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.local.primary_reads = False
+    return wrapper
+
 class UserInterface:
-    def __init__(self, user: User, connection_pool: pool.SimpleConnectionPool):
+    def __init__(self, user: User, connection_pool: pool.AbstractConnectionPool, preload_structure: bool = False, listen_structure: bool = False, permission_ttl: float = 60, object_cache_size: int = None, object_cache_ttl: float = None, health_check: bool = False, metrics: Metrics = None, id_strategy: IdStrategy = None, replica_pools: list = None, replica_stickiness: float = 5, replica_retry: float = 30):
         self.user = user
         self.connection_pool = connection_pool
+        self.replica_pools = replica_pools or []
+        self.replica_stickiness = replica_stickiness
+        self.replica_retry = replica_retry
+        self.replica_failures = {}
+        self.replica_counter = 0
+        self.replica_lock = threading.Lock()
         self.structure_cache = StructureCache()
-        self.current_connection = None
+        self.permission_cache = None
+        self.permission_ttl = permission_ttl
+        self.object_cache = ObjectCache(object_cache_size, object_cache_ttl) if object_cache_size else None
+        self.health_check = health_check
+        self.metrics = metrics
+        self.id_strategy = id_strategy or UUID7IdStrategy()
+        self.local = threading.local()
+        self.listen_connection = None
+        self.listen_lock = threading.Lock()
+        self.instance_id = uuid.uuid4().hex
+        self.preload_structure = preload_structure
+        if listen_structure:
+            self.listen_structure_changes()
+        if preload_structure:
+            self.load_structure()
+
+    @property
+    def current_connection(self):
+        """ Die dem aktuellen Thread zugeordnete Datenbankverbindung """
+        return getattr(self.local, 'connection', None)
+
+    @current_connection.setter
+    def current_connection(self, connection):
+        self.local.connection = connection
+
+    def checkout(self, connection_pool: pool.AbstractConnectionPool = None):
+        """ Entnimmt eine Datenbankverbindung aus dem (übergebenen) Connection Pool, geschlossene bzw. mit health_check nicht antwortende Verbindungen werden verworfen """
+        connection_pool = connection_pool or self.connection_pool
+        while True:
+            begin = time.perf_counter()
+            connection = connection_pool.getconn()
+            if self.metrics:
+                self.metrics.record_pool_wait(time.perf_counter() - begin)
+            if connection.closed:
+                connection_pool.putconn(connection, close=True)
+                continue
+            if self.health_check:
+                try:
+                    connection.cursor().execute('SELECT 1')
+                    connection.rollback()
+                except psycopg2.Error:
+                    connection_pool.putconn(connection, close=True)
+                    continue
+            return connection
 
     def connect(self):
         """ Weist der aktuelle Datenbankverbindung eine neue Datenbankverbindung aus dem Connection Pool zu """
-        self.current_connection = self.connection_pool.getconn()
+        self.current_connection = self.checkout()
 
     def commit(self):
-        """ Führt einen Commit mit der aktuellen Datenbankverbindung durch """
+        """ Führt einen Commit mit der aktuellen Datenbankverbindung durch, nach Schreibzugriffen lesen Replikate für replica_stickiness Sekunden nicht mehr für diesen Thread """
         self.current_connection.commit()
+        self.publish_pending_objects()
+        if getattr(self.local, 'pending_write', False):
+            self.local.last_write = time.monotonic()
+            self.local.pending_write = False
+
+    def rollback(self):
+        """ Führt einen Rollback mit der aktuellen Datenbankverbindung durch, die in der Transaktion geschriebenen Objekte gelangen nicht in den Objektcache """
+        self.current_connection.rollback()
+        self.local.pending_write = False
+        self.local.pending_objects = None
 
     def disconnect(self):
-        """ Trennt die aktuelle Datenbankverbindung """
+        """ Gibt die aktuelle Datenbankverbindung an den Connection Pool zurück, nicht committete Änderungen werden verworfen """
         if self.current_connection:
-            self.current_connection.close()
+            self.connection_pool.putconn(self.current_connection)
             self.current_connection = None
+            self.local.pending_write = False
+            self.local.pending_objects = None
+        self.disconnect_replica()
+
+    def get_pending_objects(self) -> dict:
+        """ Gibt die in der laufenden Transaktion des aktuellen Threads geschriebenen Objekte zurück, die erst mit dem Commit in den Objektcache übernommen werden (None für zu entfernende IDs) """
+        pending_objects = getattr(self.local, 'pending_objects', None)
+        if pending_objects is None:
+            pending_objects = self.local.pending_objects = {}
+        return pending_objects
+
+    def publish_pending_objects(self):
+        """ Übernimmt nach dem Commit die Objekte der Transaktion in den Objektcache bzw. entfernt die geänderten IDs daraus """
+        self.store_pending_objects(getattr(self.local, 'pending_objects', None))
+        self.local.pending_objects = None
+
+    def store_pending_objects(self, pending_objects: dict):
+        """ Legt vorgemerkte Objekte im Objektcache ab und entfernt die mit None vorgemerkten IDs """
+        if pending_objects and self.object_cache:
+            for id, object_ in pending_objects.items():
+                if object_ is None:
+                    self.object_cache.remove(id)
+                else:
+                    self.object_cache.store(object_)
+
+    def get_session(self):
+        """ Gibt die im aktuellen Thread geöffnete Session zurück, None falls keine geöffnet ist """
+        return getattr(self.local, 'session', None)
+
+    @contextmanager
+    def session(self, batch_size: int = 1000):
+        """ Öffnet eine Session, die Erstellungen und Änderungen von Objekten sammelt und beim Commit gebündelt schreibt """
+        with self.transaction():
+            self.local.session = Session(self, batch_size)
+            try:
+                yield self.local.session
+                self.local.session.flush()
+            finally:
+                self.local.session = None
+
+    def migration(self, batch_size: int = 10000, pause: float = 0.0, lock_timeout: str = '5s') -> Migration:
+        """ Erstellt eine Migration, die Strukturänderungen sammelt und mit apply() ohne lange Schreibsperren einspielt """
+        return Migration(self, batch_size, pause, lock_timeout)
+
+    def in_transaction(self) -> bool:
+        """ Gibt zurück, ob der aktuelle Thread sich innerhalb eines transaction()-Blocks befindet """
+        return getattr(self.local, 'transaction_depth', 0) > 0
+
+    @contextmanager
+    def transaction(self):
+        """ Stellt dem aktuellen Thread eine Datenbankverbindung bereit, die am Ende des äußersten Blocks committet bzw. bei Fehlern zurückgerollt und an den Connection Pool zurückgegeben wird """
+        depth = getattr(self.local, 'transaction_depth', 0)
+        if depth > 0:
+            # Verschachtelt: Die äußere Transaktion entscheidet über Commit und Rollback
+            self.local.transaction_depth = depth + 1
+            try:
+                yield self.current_connection
+            finally:
+                self.local.transaction_depth = depth
+            return
+
+        # Eine implizit über get_connection() geöffnete Verbindung wird Teil dieser Transaktion
+        if not self.current_connection:
+            self.connect()
+        self.local.transaction_depth = 1
+        try:
+            yield self.current_connection
+            self.commit()
+        except BaseException:
+            self.rollback()
+            raise
+        finally:
+            self.local.transaction_depth = 0
+            self.disconnect()
 
     def get_connection(self):
         """ Gibt eine neue Datenbankverbindung aus dem Connection Pool zurück """
         if not self.current_connection:
             self.connect()
+        if self.listen_connection:
+            self.process_structure_changes()
         return self.current_connection
 
-    ################################################## Klasse ##################################################
-    def create_class(self, name: str, parent: Class = None) -> Class:
-        """ Erstellt eine neue Objektklasse und gibt Klassenobjekt zurück """
-        cursor = self.get_connection().cursor()
-        if parent:
-            cursor.execute('INSERT INTO structure.class (name, parent_id) VALUES (%s, %s) RETURNING id', (name, parent.id))
+    def cursor(self, dict_rows: bool = False, name: str = None, read_only: bool = False, replica: bool = False):
+        """ Erzeugt einen Cursor auf der Datenbankverbindung des aktuellen Threads, mit dict_rows werden Zeilen als Dictionary geliefert, mit aktiven Metriken werden alle Anweisungen erfasst, read_only kennzeichnet rein lesende Zugriffe, mit replica wird nach Möglichkeit ein Replikat verwendet """
+
+        # In einer Session vorgemerkte Objekte müssen vor jeder weiteren Anweisung in der Datenbank stehen (Fremdschlüssel, Lesezugriffe)
+        session = self.get_session()
+        if session is not None:
+            session.autoflush()
+        if self.metrics:
+            cursor_factory = InstrumentedRealDictCursor if dict_rows else InstrumentedCursor
+        else:
+            cursor_factory = psycopg2.extras.RealDictCursor if dict_rows else None
+        if replica:
+            connection = self.get_read_connection()
         else:
-            cursor.execute('INSERT INTO structure.class (name) VALUES (%s) RETURNING id', (name,))
+            # Jeder nicht als read_only gekennzeichnete Cursor gilt als möglicher Schreibzugriff
+            connection = self.get_connection()
+            if not read_only:
+                self.local.pending_write = True
+        return connection.cursor(name=name, cursor_factory=cursor_factory)
+
+    ################################################## Replikate ##################################################
+    @property
+    def replica_connection(self):
+        """ Die dem aktuellen Thread zugeordnete Verbindung zu einem Replikat """
+        return getattr(self.local, 'replica_connection', None)
+
+    def is_sticky(self) -> bool:
+        """ Gibt zurück, ob der aktuelle Thread noch vom Primärserver lesen muss (nicht committete oder vor weniger als replica_stickiness Sekunden committete Schreibzugriffe) """
+        if getattr(self.local, 'pending_write', False):
+            return True
+        last_write = getattr(self.local, 'last_write', None)
+        return last_write is not None and time.monotonic() - last_write < self.replica_stickiness
+
+    def connect_replica(self):
+        """ Weist dem aktuellen Thread eine Verbindung zu einem erreichbaren Replikat zu (reihum), gibt None zurück falls keines erreichbar ist """
+        count = len(self.replica_pools)
+        with self.replica_lock:
+            self.replica_counter += 1
+            start = self.replica_counter
+        for i in range(count):
+            replica_pool = self.replica_pools[(start + i) % count]
+            with self.replica_lock:
+                if time.monotonic() < self.replica_failures.get(id(replica_pool), 0):
+                    continue
+            try:
+                connection = self.checkout(replica_pool)
+                connection.autocommit = True
+            except (psycopg2.Error, pool.PoolError):
+                self.mark_replica_failed(replica_pool)
+                continue
+            self.local.replica_connection = connection
+            self.local.replica_pool = replica_pool
+            return connection
+        return None
+
+    def mark_replica_failed(self, replica_pool: pool.AbstractConnectionPool):
+        """ Überspringt das Replikat für replica_retry Sekunden """
+        with self.replica_lock:
+            self.replica_failures[id(replica_pool)] = time.monotonic() + self.replica_retry
+
+    def fail_replica(self):
+        """ Verwirft die ausgefallene Replikatverbindung des aktuellen Threads und überspringt ihr Replikat für replica_retry Sekunden """
+        self.mark_replica_failed(self.local.replica_pool)
+        self.disconnect_replica(close=True)
+
+    def disconnect_replica(self, close: bool = False):
+        """ Gibt die Replikatverbindung des aktuellen Threads an ihren Connection Pool zurück, mit close (oder falls sie geschlossen ist) wird sie verworfen """
+        connection = self.replica_connection
+        if connection:
+            self.local.replica_pool.putconn(connection, close=close or bool(connection.closed))
+            self.local.replica_connection = None
+            self.local.replica_pool = None
+
+    def use_replica(self) -> bool:
+        """ Gibt zurück, ob lesende Zugriffe des aktuellen Threads auf ein Replikat dürfen: Replikate vorhanden, keine offene Transaktion oder Session, nicht am Primärserver klebend und nicht in der Wiederholung nach einem Replikatausfall """
+        if not self.replica_pools or self.in_transaction() or self.get_session() is not None:
+            return False
+        return not self.is_sticky() and not getattr(self.local, 'primary_reads', False)
+
+    def get_read_connection(self):
+        """ Gibt die Datenbankverbindung für lesende Zugriffe zurück: ein Replikat, sofern use_replica() zutrifft und eines erreichbar ist, sonst den Primärserver """
+        if self.use_replica():
+            connection = self.replica_connection
+            if connection is not None and connection.closed:
+                self.disconnect_replica()
+                connection = None
+            if connection is None:
+                connection = self.connect_replica()
+            if connection is not None:
+                if self.listen_connection:
+                    self.process_structure_changes()
+                return connection
+        return self.get_connection()
+
+    def get_metrics(self) -> dict:
+        """ Gibt eine Momentaufnahme der Metriken (Operationen, Connection Pool, Caches) zurück, None falls keine Metriken erfasst werden """
+        if self.metrics is None:
+            return None
+        snapshot = self.metrics.snapshot()
+        snapshot['caches'] = {'structure': self.structure_cache.get_statistics()}
+        if self.object_cache:
+            snapshot['caches']['object'] = self.object_cache.get_statistics()
+        if self.permission_cache:
+            snapshot['caches']['permission'] = self.permission_cache.get_statistics()
+        return snapshot
+
+    ################################################## Strukturänderungen ##################################################
+    def listen_structure_changes(self):
+        """ Reserviert eine Datenbankverbindung, über die Strukturänderungen anderer Schnittstellen empfangen werden """
+        if self.listen_connection:
+            return
+        self.listen_connection = self.connection_pool.getconn()
+        self.listen_connection.autocommit = True
+        cursor = self.listen_connection.cursor()
+        cursor.execute(f'LISTEN {STRUCTURE_CHANNEL}')
+
+        # Ausgangspunkt für die Erkennung fehlender Benachrichtigungen
+        cursor.execute('SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM structure.version')
+        self.structure_cache.version = cursor.fetchone()[0]
+
+    def stop_listening_structure_changes(self):
+        """ Beendet den Empfang von Strukturänderungen und gibt die Datenbankverbindung an den Connection Pool zurück """
+        if self.listen_connection:
+            self.listen_connection.cursor().execute(f'UNLISTEN {STRUCTURE_CHANNEL}')
+            self.connection_pool.putconn(self.listen_connection)
+            self.listen_connection = None
+
+    def process_structure_changes(self):
+        """ Verarbeitet eingegangene Strukturänderungen anderer Schnittstellen und verwirft die betroffenen Cacheeinträge, nach einer Lücke in der Versionsfolge oder einem Verbindungsabbruch wird der gesamte Strukturcache verworfen """
+        missed = False
+        with self.listen_lock:
+            try:
+                self.listen_connection.poll()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                # Während der Unterbrechung können Benachrichtigungen verloren gegangen sein
+                self.connection_pool.putconn(self.listen_connection, close=True)
+                self.listen_connection = None
+                self.listen_structure_changes()
+                missed = True
+            while self.listen_connection.notifies:
+                version, instance_id, kind, id = self.listen_connection.notifies.pop(0).payload.split(':', 3)
+                version = int(version)
+
+                # Lücken entstehen auch durch zurückgerollte Strukturänderungen, ein unnötiges Neuladen ist dann unschädlich
+                missed = missed or self.structure_cache.is_gap(version)
+                if instance_id != self.instance_id:
+                    self.structure_cache.invalidate(kind, id, version)
+                else:
+                    self.structure_cache.version = max(self.structure_cache.version, version)
+        if missed:
+            self.reload_structure()
+
+    def reload_structure(self):
+        """ Verwirft den gesamten Strukturcache, mit preload_structure wird die Struktur sofort neu geladen, sonst bei Bedarf """
+        self.structure_cache.reset()
+        if self.preload_structure:
+            self.load_structure()
+
+    @instrumented
+    def notify_structure_change(self, kind: str, id: str):
+        """ Veröffentlicht eine Strukturänderung ('class', 'attribute', 'attribute_assignment' oder 'reference'), wird mit dem Commit zugestellt """
+        cursor = self.cursor()
+        cursor.execute("SELECT pg_notify(%s, concat_ws(':', nextval('structure.version'), %s, %s, %s))", (STRUCTURE_CHANNEL, self.instance_id, kind, id))
+
+    def execute_prepared(self, cursor, key: tuple, generator, values: tuple):
+        """ Führt die zum Schlüssel gehörige Anweisung serverseitig vorbereitet aus, generator erzeugt bei Bedarf das SQL mit $n-Parametern """
+        statement_cache = self.structure_cache.statement_cache
+        statement = statement_cache.get(key)
+        if statement is None:
+            statement = statement_cache.store(key, generator())
+        name, sql = statement
+        connection = cursor.connection
+
+        # Nach Strukturänderungen verworfene Anweisungen zuerst auf der Verbindung entfernen
+        if statement_cache.is_outdated(connection):
+            cursor.execute('DEALLOCATE ALL')
+            statement_cache.mark_deallocated(connection)
+        if not statement_cache.is_prepared(connection, name):
+            cursor.execute(f'PREPARE {name} AS {sql}')
+            statement_cache.mark_prepared(connection, name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(values))})", values)
+
+    ################################################## Klasse ##################################################
+    def get_class_table_sql(self, name: str, parent: Class = None, partitions: int = None) -> str:
+        """ Erzeugt die Anweisungen zum Anlegen der Klassentabelle, mit partitions wird sie nach dem Hash der ID partitioniert und die Partitionen direkt angelegt """
+        sql = f"CREATE TABLE data.{name} (id UUID {f'REFERENCES data.{parent.name}(id)' if parent else 'REFERENCES data.meta(id)'} PRIMARY KEY)"
+        if not partitions:
+            return sql
+        return f'{sql} PARTITION BY HASH (id);\n{get_hash_partitions_sql(f"data.{name}", partitions)}'
+
+    @instrumented
+    def create_class(self, name: str, parent: Class = None, partitions: int = None) -> Class:
+        """ Erstellt eine neue Objektklasse und gibt Klassenobjekt zurück, mit partitions wird die Klassentabelle in entsprechend viele Hash-Partitionen aufgeteilt """
+        cursor = self.cursor()
+        cursor.execute('INSERT INTO structure.class (name, parent_id, partitions) VALUES (%s, %s, %s) RETURNING id', (name, parent.id if parent else None, partitions))
         id = cursor.fetchone()[0]
-        cursor.execute(f"CREATE TABLE data.{name} (id UUID {f'REFERENCES data.{parent.name}(id)' if parent else 'REFERENCES data.meta(id)'} PRIMARY KEY)")
-        return Class(self, id, name, None if parent is None else parent.id)
+        cursor.execute(self.get_class_table_sql(name, parent, partitions))
+        self.notify_structure_change('class', id)
+        return Class(self, id, name, None if parent is None else parent.id, partitions=partitions)
 
+    @instrumented
     def get_class_from_db_by_id(self, id: str) -> Class:
         """ Gibt Klassenobjekt per Datenbankzugriff anhand dessen ID zurück """
-        cursor = self.get_connection().cursor()
-        cursor.execute('SELECT name, parent_id FROM class WHERE id = %s', (id,))
+        cursor = self.cursor(read_only=True)
+        cursor.execute('SELECT name, parent_id, view_mode, partitions FROM structure.class WHERE id = %s', (id,))
         res = cursor.fetchone()
         if res:
-            return Class(id, res[0], res[1])
+            return Class(self, id, res[0], res[1], res[2], res[3])
         else:
             return None
 
@@ -81,13 +516,14 @@ class UserInterface:
             class_ = self.get_class_from_db_by_id(id)
         return class_
 
+    @instrumented
     def get_class_from_db_by_name(self, name: str) -> Class:
         """ Gibt Klassenobjekt per Datenbankzugriff anhand dessen Name zurück """
-        cursor = self.get_connection().cursor()
-        cursor.execute('SELECT id, parent_id FROM structure.class WHERE name = %s', (name,))
+        cursor = self.cursor(read_only=True)
+        cursor.execute('SELECT id, parent_id, view_mode, partitions FROM structure.class WHERE name = %s', (name,))
         res = cursor.fetchone()
         if res:
-            return Class(res[0], name, res[1])
+            return Class(self, res[0], name, res[1], res[2], res[3])
         else:
             return None
 
@@ -98,9 +534,10 @@ class UserInterface:
             class_ = self.get_class_from_db_by_name(name)
         return class_
 
+    @instrumented
     def get_assigned_attributes_from_db(self, class_: Class):
         """ Gibt per Datenbankzugriff die der übergebenen Klasse zugewiesen Attribute zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor(read_only=True)
         cursor.execute('SELECT a.id FROM structure.attribute_assignment as aa JOIN structure.attribute as a ON aa.attribute_id = a.id WHERE aa.class_id = %s', (class_.id,))
         return [self.get_attribute_by_id(row[0]) for row in cursor.fetchall()]
 
@@ -108,37 +545,150 @@ class UserInterface:
         """ Gibt die der übergebenen Klasse zugewiesen Attribute zurück """
         return class_.get_assigned_attributes()
 
-    def update_class_view(self, class_: Class):
-        """ Erstellt oder aktualisiert in der Datenbank eine View zum Anzeigen aller Objekte der übergebenen Klasse """
+    @instrumented
+    def load_structure(self):
+        """ Lädt alle Klassen, Attribute, Attributzuweisungen und Referenzen gesammelt in den Strukturcache """
+        cursor = self.cursor(read_only=True)
 
-        # Query erzeugen
-        class_attributes = {}
-        for current_class in class_.get_family_tree():
-            class_attributes[current_class.name] = [a.name for a in current_class.get_assigned_attributes()]
-        cols = []
+        # Klassen
+        cursor.execute('SELECT id, name, parent_id, view_mode, partitions FROM structure.class')
+        classes = [Class(self, row[0], row[1], row[2], row[3], row[4]) for row in cursor.fetchall()]
+        for class_ in classes:
+            class_.assigned_attributes = []
+
+        # Attribute
+        cursor.execute('SELECT id, name, generator, indexed FROM structure.attribute')
+        for row in cursor.fetchall():
+            Attribute(self, row[0], row[1], row[2], row[3])
+
+        # Attributzuweisungen
+        cursor.execute('SELECT class_id, attribute_id FROM structure.attribute_assignment')
+        for row in cursor.fetchall():
+            self.structure_cache.get_class('id', row[0]).assigned_attributes.append(self.structure_cache.get_attribute('id', row[1]))
+
+        # Referenzen
+        cursor.execute('SELECT id, name, origin_class_id, target_class_id FROM structure.reference')
+        for row in cursor.fetchall():
+            Reference(self, row[0], row[1], row[2], row[3])
+
+        # Stammbäume vorberechnen
+        for class_ in classes:
+            class_.get_family_tree()
+
+    def get_class_select_sql(self, class_: Class, where: str = None) -> str:
+        """ Erzeugt die Abfrage, die die Tabellen des Stammbaums zu den Objekten der übergebenen Klasse zusammenführt """
+        family_tree = class_.get_family_tree()
+        str_origin_class = family_tree[0].name
+        cols = [f'data.{str_origin_class}.id']
         joins = []
-        str_origin_class = None
-        for c in class_attributes:
-            cols.append(', '.join([f'data.{c}.{a}' for a in class_attributes[c]]))
-            if not str_origin_class:
-                str_origin_class = c
-            else:
-                joins.append(f'JOIN data.{c} ON data.{str_origin_class}.id = data.{c}.id')
+        for current_class in family_tree:
+            cols.extend([f'data.{current_class.name}.{a.name}' for a in current_class.get_assigned_attributes()])
+            if current_class is not family_tree[0]:
+                joins.append(f'JOIN data.{current_class.name} ON data.{str_origin_class}.id = data.{current_class.name}.id')
+        return f"SELECT {', '.join(cols)} FROM data.{str_origin_class} {' '.join(joins)}{f' WHERE {where}' if where else ''}"
+
+    def get_drop_class_view_sql(self, class_: Class, view_mode: str) -> str:
+        """ Erzeugt die Anweisungen zum Entfernen der View der übergebenen Klasse im angegebenen Modus """
+        view_name = class_.get_view_name()
+        if view_mode == 'view':
+            return f'DROP VIEW IF EXISTS {view_name};'
+        elif view_mode == 'materialized':
+            return f'DROP MATERIALIZED VIEW IF EXISTS {view_name};'
+        elif view_mode == 'table':
+            return f'DROP TABLE IF EXISTS {view_name}; DROP FUNCTION IF EXISTS data.refresh_{view_name}() CASCADE;'
+        raise ValueError(f'Unbekannter View-Modus {view_mode}')
+
+    def get_class_view_sql(self, class_: Class) -> str:
+        """ Erzeugt die Anweisungen zum Erstellen oder Aktualisieren der View der übergebenen Klasse gemäß deren View-Modus """
+        view_name = class_.get_view_name()
+        query = [self.get_drop_class_view_sql(class_, class_.view_mode)]
+        indexed_attributes = [a.name for c in class_.get_family_tree() for a in c.get_assigned_attributes() if a.indexed]
+        if class_.view_mode == 'view':
+            query.append(f'CREATE VIEW {view_name} AS {self.get_class_select_sql(class_)};')
+        elif class_.view_mode == 'materialized':
+            query.append(f'CREATE MATERIALIZED VIEW {view_name} AS {self.get_class_select_sql(class_)};')
+            query.append(f'CREATE UNIQUE INDEX {view_name}_id ON {view_name}(id);')
+            query.extend([f'CREATE INDEX {view_name}_{a} ON {view_name}({a});' for a in indexed_attributes])
+        else:
+
+            # Denormalisierte Tabelle, die über Trigger auf allen Tabellen des Stammbaums zeilenweise nachgeführt wird
+            str_origin_class = class_.get_family_tree()[0].name
+            query.append(f'CREATE TABLE {view_name} AS {self.get_class_select_sql(class_)};')
+            query.append(f'ALTER TABLE {view_name} ADD PRIMARY KEY (id);')
+            query.extend([f'CREATE INDEX {view_name}_{a} ON {view_name}({a});' for a in indexed_attributes])
+            query.append(f"""
+            CREATE FUNCTION data.refresh_{view_name}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    DELETE FROM {view_name} WHERE id = OLD.id;
+                    RETURN NULL;
+                END IF;
+                DELETE FROM {view_name} WHERE id = NEW.id;
+                INSERT INTO {view_name} {self.get_class_select_sql(class_, f'data.{str_origin_class}.id = NEW.id')};
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;""")
+            for current_class in class_.get_family_tree():
+                query.append(f'CREATE TRIGGER {view_name}_{current_class.name} AFTER INSERT OR UPDATE OR DELETE ON data.{current_class.name} FOR EACH ROW EXECUTE FUNCTION data.refresh_{view_name}();')
+        return '\n'.join(query)
+
+    def get_refresh_class_view_sql(self, class_: Class, ids: list = None, concurrently: bool = True) -> list:
+        """ Erzeugt die Anweisungen samt Parametern zum Aktualisieren der Daten der View als Liste von (SQL, Parameter), für einfache Views ist sie leer """
+        view_name = class_.get_view_name()
+        if class_.view_mode == 'materialized':
+
+            # Materialisierte Views können nur vollständig aktualisiert werden
+            return [(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{view_name}", ())]
+        elif class_.view_mode == 'table':
+            str_origin_class = class_.get_family_tree()[0].name
+            if ids is not None:
+                return [
+                    (f'DELETE FROM {view_name} WHERE id = ANY(%s::uuid[])', (list(ids),)),
+                    (f"INSERT INTO {view_name} {self.get_class_select_sql(class_, f'data.{str_origin_class}.id = ANY(%s::uuid[])')}", (list(ids),))
+                ]
+            return [
+                (f'DELETE FROM {view_name}' if concurrently else f'TRUNCATE {view_name}', ()),
+                (f'INSERT INTO {view_name} {self.get_class_select_sql(class_)}', ())
+            ]
+        return []
+
+    @instrumented
+    def refresh_class_view(self, class_: Class, ids: list = None, concurrently: bool = True):
+        """ Aktualisiert die Daten einer materialisierten bzw. denormalisierten View, mit ids nur die Zeilen der übergebenen Objekte """
+        cursor = self.cursor()
+        for sql, values in self.get_refresh_class_view_sql(class_, ids, concurrently):
+            cursor.execute(sql, values)
+
+    @instrumented
+    def set_class_view_mode(self, class_: Class, view_mode: str):
+        """ Legt fest, ob die View der Klasse als einfache View ('view'), materialisierte View ('materialized') oder über Trigger nachgeführte Tabelle ('table') angelegt wird """
+        cursor = self.cursor()
+        cursor.execute(self.get_drop_class_view_sql(class_, class_.view_mode))
+        cursor.execute('UPDATE structure.class SET view_mode = %s WHERE id = %s', (view_mode, class_.id))
+        class_.view_mode = view_mode
+        cursor.execute(self.get_class_view_sql(class_))
+        self.notify_structure_change('class', class_.id)
 
-        # Datenbankabfrage
-        cursor = self.get_connection().cursor()
-        cursor.execute(f"CREATE OR REPLACE VIEW {class_.get_view_name()} AS SELECT {', '.join([f'data.{str_origin_class}.id', *cols])} FROM data.{str_origin_class} {', '.join(joins)}")
+    @instrumented
+    def update_class_view(self, class_: Class):
+        """ Erstellt oder aktualisiert in der Datenbank eine View zum Anzeigen aller Objekte der übergebenen Klasse """
+        cursor = self.cursor()
+        cursor.execute(self.get_class_view_sql(class_))
 
     ################################################## Attribut ##################################################
+    @instrumented
     def create_attribute(self, name: str, generator: str, indexed: bool) -> Attribute:
         """ Erstellt ein neues Attribut und gibt Attributobjekt zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         cursor.execute('INSERT INTO structure.attribute (name, generator, indexed) VALUES (%s, %s, %s) RETURNING id', (name, generator, indexed))
-        return Attribute(self, cursor.fetchone()[0], name, generator, indexed)
+        id = cursor.fetchone()[0]
+        self.notify_structure_change('attribute', id)
+        return Attribute(self, id, name, generator, indexed)
 
+    @instrumented
     def get_attribute_from_db_by_id(self, id: str) -> Attribute:
         """ Gibt Attributobjekt per Datenbankzugriff anhand dessen ID zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor(read_only=True)
         cursor.execute('SELECT name, generator, indexed FROM structure.attribute WHERE id = %s', (id,))
         res = cursor.fetchone()
         if res:
@@ -153,9 +703,10 @@ class UserInterface:
             attribute = self.get_attribute_from_db_by_id(id)
         return attribute
 
+    @instrumented
     def get_attribute_from_db_by_name(self, name: str) -> Attribute:
         """ Gibt Attributobjekt per Datenbankzugriff anhand dessen Name zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor(read_only=True)
         cursor.execute('SELECT id, generator, indexed FROM structure.attribute WHERE name = %s', (name,))
         res = cursor.fetchone()
         if res:
@@ -170,35 +721,66 @@ class UserInterface:
             attribute = self.get_attribute_from_db_by_name(name)
         return attribute
 
-    def assign_attribute(self, attribute: Attribute, class_: Class, nullable: bool, default: str = None) -> bool:
-        """ Weist ein Attribut einer Klasse zu """
-        cursor = self.get_connection().cursor()
-        generator = f"{attribute.generator}{' NOT NULL' if not nullable else ''}{f' DEFAULT {default}' if default else ''}"
+    def get_assign_attribute_sql(self, attribute: Attribute, class_: Class, nullable: bool, default: str = None, index: bool = True, backfill: bool = False) -> str:
+        """ Erzeugt die DDL-Anweisungen zum Hinzufügen der Spalte eines Attributs zur Klassentabelle, ohne index wird ein indiziertes Attribut nicht indiziert, mit backfill gilt der Default nur für neue Zeilen und NOT NULL wird nicht gesetzt """
+        if backfill and default:
+            # Bestehende Zeilen bleiben NULL und werden vom Aufrufer nachgetragen, die Spalte wird ohne Umschreiben der Tabelle angelegt
+            columns = f"""
+            ALTER TABLE data.{class_.name} ADD COLUMN {attribute.name} {attribute.generator};
+            ALTER TABLE data.{class_.name} ALTER COLUMN {attribute.name} SET DEFAULT {default};
+            """
+        else:
+            columns = f"ALTER TABLE data.{class_.name} ADD COLUMN {attribute.name} {attribute.generator}{' NOT NULL' if not nullable else ''}{f' DEFAULT {default}' if default else ''};"
+        return f"""
+        {columns}
+        {f'{self.get_attribute_index_sql(attribute, class_)};' if attribute.indexed and index else ''}
+        """
+
+    def get_attribute_index_sql(self, attribute: Attribute, class_: Class, concurrently: bool = False, table: str = None) -> str:
+        """ Erzeugt die Anweisung zum Indizieren der Spalte eines Attributs, table weicht bei Partitionen vom Namen der Klassentabelle ab """
+        table = table or class_.name
+        return f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{table}_{attribute.name} ON data.{table}({attribute.name})"
+
+    @instrumented
+    def assign_attribute(self, attribute: Attribute, class_: Class, nullable: bool, default: str = None, index: bool = True, backfill: bool = False) -> bool:
+        """ Weist ein Attribut einer Klasse zu, index und backfill wie bei get_assign_attribute_sql() """
+        cursor = self.cursor()
         cursor.execute(f"""
         INSERT INTO structure.attribute_assignment (class_id, attribute_id, nullable, "default") VALUES (%s, %s, %s, %s);
-        ALTER TABLE data.{class_.name} ADD COLUMN {attribute.name} {generator};
-        {f'CREATE INDEX {class_.name}_{attribute.name} ON data.{class_.name}({attribute.name});' if attribute.indexed else ''}
+        {self.get_assign_attribute_sql(attribute, class_, nullable, default, index, backfill)}
         """, (class_.id, attribute.id, nullable, default))
+        if class_.assigned_attributes is not None:
+            class_.assigned_attributes.append(attribute)
+        self.structure_cache.reset_derived()
+        self.notify_structure_change('attribute_assignment', class_.id)
         return AttributeAssignment(self, class_.id, attribute.id, nullable, default)
 
     ################################################## Referenz ##################################################
-    def create_reference(self, name: str, origin_class: Class, target_class: Class) -> Reference:
-        """ Erstellt eine neue Referenz und gibt Referenzobjekt zurück """
-        cursor = self.get_connection().cursor()
-        cursor.execute('INSERT INTO structure.reference (name, origin_class_id, target_class_id) VALUES (%s, %s, %s) RETURNING id', (name, origin_class.id, target_class.id))
-        id = cursor.fetchone()[0]
-        cursor.execute(f"""
+    def get_reference_table_sql(self, name: str, origin_class: Class, target_class: Class) -> str:
+        """ Erzeugt die Anweisung zum Erstellen der Tabelle einer Referenz """
+        return f"""
         CREATE TABLE reference.{name} (
             origin_id UUID REFERENCES data.{origin_class.name},
             target_id UUID REFERENCES data.{target_class.name},
             PRIMARY KEY (origin_id, target_id)
-        )
-        """)
+        );
+        CREATE INDEX {name}_target_id ON reference.{name}(target_id);
+        """
+
+    @instrumented
+    def create_reference(self, name: str, origin_class: Class, target_class: Class) -> Reference:
+        """ Erstellt eine neue Referenz und gibt Referenzobjekt zurück """
+        cursor = self.cursor()
+        cursor.execute('INSERT INTO structure.reference (name, origin_class_id, target_class_id) VALUES (%s, %s, %s) RETURNING id', (name, origin_class.id, target_class.id))
+        id = cursor.fetchone()[0]
+        cursor.execute(self.get_reference_table_sql(name, origin_class, target_class))
+        self.notify_structure_change('reference', id)
         return Reference(self, id, name, origin_class.id, target_class.id)
 
+    @instrumented
     def get_reference_from_db_by_name(self, name: str) -> Reference:
         """ Gibt Referenzobjekt per Datenbankzugriff anhand dessen Name zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor(read_only=True)
         cursor.execute('SELECT id, origin_class_id, target_class_id FROM structure.reference WHERE name = %s', (name,))
         res = cursor.fetchone()
         if res:
@@ -214,159 +796,818 @@ class UserInterface:
         return reference
 
     ################################################## Objekt ##################################################
+    def get_create_object_sql(self, class_: Class, insert_attributes: tuple, placeholder: str = '${}') -> str:
+        """ Erzeugt eine einzelne Anweisung mit $n-Parametern (bzw. dem übergebenen Platzhalterformat), die Metadaten und alle Klassentabellen des Stammbaums mit der vorab erzeugten ID ($1) befüllt """
+        queries = []
+        i = 4
+        for n, current_class in enumerate(class_.get_family_tree()):
+
+            # Einzufügende Attribute ermitteln
+            class_attributes = [a.name for a in current_class.get_assigned_attributes()]
+            cols = [a for a in insert_attributes if a in class_attributes]
+
+            # Teilquery zusammenbauen
+            str_cols = ', '.join(['id', *cols])
+            str_values = ', '.join([placeholder.format(1), *[placeholder.format(i + k) for k in range(len(cols))]])
+            i += len(cols)
+            queries.append(f'c{n} AS (INSERT INTO data.{current_class.name} ({str_cols}) VALUES ({str_values}))')
+
+        # Die Fremdschlüssel auf data.meta werden erst am Ende der Anweisung geprüft
+        return f"WITH {', '.join(queries)} INSERT INTO data.meta (id, class_id, creator_id) VALUES ({', '.join([placeholder.format(k) for k in (1, 2, 3)])})"
+
+    @instrumented
     def create_object(self, class_: Class, **attributes) -> Object:
         """ Erstellt ein Objekt der angegebenen Klasse mithilfe der angegebenen Attribute (att1=x, att2=y, ...) """
-        cursor = self.get_connection().cursor()
+        session = self.get_session()
+        if session:
+            object_ = Object(self, self.id_strategy.generate(), class_, **attributes)
+            session.add_creation(object_, attributes)
+            self.cache_written_object(object_)
+            return object_
 
-        # Metadaten des Objeks einfügen
-        cursor.execute('INSERT INTO data.meta (class_id, creator_id) VALUES (%s, %s) RETURNING id', (class_.id, self.user.id))
-        id = cursor.fetchone()[0]
+        # Das Objekt vorab erzeugen, damit unbekannte Attribute vor dem Schreiben auffallen
+        cursor = self.cursor()
+        object_ = Object(self, self.id_strategy.generate(), class_, **attributes)
+        insert_attributes = tuple(a for a in class_.get_layout() if a in attributes)
+        values = (object_.id, class_.id, self.user.id, *[attributes[a] for a in insert_attributes])
+        self.execute_prepared(cursor, ('create_object', class_.id, insert_attributes), lambda: self.get_create_object_sql(class_, insert_attributes), values)
+        self.cache_written_object(object_)
+        return object_
 
-        query = []
-        values = []
-        for current_class in class_.get_family_tree():
+    @instrumented
+    def insert_objects(self, class_: Class, ids: list, rows: list, batch_size: int = 1000):
+        """ Fügt Metadaten und alle Klassentabellen des Stammbaums für Objekte mit bekannten IDs mengenbasiert ein """
+        cursor = self.cursor()
+        family_tree = class_.get_family_tree()
 
-            # Einzufügende Attribute ermitteln
+        # Metadaten der Objekte einfügen
+        psycopg2.extras.execute_values(cursor, 'INSERT INTO data.meta (id, class_id, creator_id) VALUES %s',
+                                       [(id, class_.id, self.user.id) for id in ids], page_size=batch_size)
+
+        for current_class in family_tree:
             class_attributes = [a.name for a in current_class.get_assigned_attributes()]
-            insert_attributes = [a for a in attributes if a in class_attributes]
 
-            # Query zusammenbauen
-            str_cols = ', '.join(insert_attributes)
-            str_values = ', '.join(['%s'] * len(insert_attributes))
-            values.append(id)
-            values.extend([attributes[key] for key in insert_attributes])
-            query.append(f'INSERT INTO data.{current_class.name} (id, {str_cols}) VALUES (%s, {str_values});')
+            # Zeilen nach einzufügenden Attributen gruppieren
+            groups = {}
+            for id, attributes in zip(ids, rows):
+                insert_attributes = tuple(a for a in class_attributes if a in attributes)
+                groups.setdefault(insert_attributes, []).append((id, *[attributes[a] for a in insert_attributes]))
 
-        # Query ausführen
-        if len(query) > 0:
-            cursor.execute('\n'.join(query), tuple(values))
+            # Je Gruppe ein mehrzeiliges INSERT ausführen
+            for insert_attributes, values in groups.items():
+                str_cols = ', '.join(['id', *insert_attributes])
+                psycopg2.extras.execute_values(cursor, f'INSERT INTO data.{current_class.name} ({str_cols}) VALUES %s', values, page_size=batch_size)
+
+    @instrumented
+    def create_objects(self, class_: Class, rows: list, batch_size: int = 1000) -> list:
+        """ Erstellt mengenbasiert Objekte der angegebenen Klasse, rows ist eine Liste von Attribut-Dictionaries """
+        cursor = self.cursor()
+        objects = []
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+
+            # IDs clientseitig vorab erzeugen, damit die Zuordnung zwischen Zeilen und IDs eindeutig ist
+            ids = self.id_strategy.generate_many(len(batch))
+            batch_objects = [Object(self, id, class_, **attributes) for id, attributes in zip(ids, batch)]
+            self.insert_objects(class_, ids, batch, batch_size)
+            objects.extend(batch_objects)
+        if self.object_cache:
+            for object_ in objects:
+                self.cache_written_object(object_)
+        return objects
+
+    def build_object(self, class_: Class, row: dict) -> Object:
+        """ Erzeugt ein Objekt aus einer Zeile der View der übergebenen Klasse, Spalten außerhalb des Layouts (z.B. bei veraltetem Strukturcache) werden übergangen """
+        layout = class_.get_layout()
+        return Object(self, row['id'], class_, **{a: v for a, v in row.items() if a in layout})
+
+    def cache_object(self, object_: Object):
+        """ Legt ein gelesenes Objekt im Objektcache ab, nach nicht committeten Schreibzugriffen des aktuellen Threads erst mit dem Commit """
+        if self.object_cache:
+            if getattr(self.local, 'pending_write', False):
+                self.get_pending_objects()[object_.id] = object_
+            else:
+                self.object_cache.store(object_)
+
+    def cache_written_object(self, object_: Object):
+        """ Merkt ein erstelltes oder geändertes Objekt für den Objektcache vor, andere Threads sehen bis zum Commit weiterhin den alten Stand aus der Datenbank """
+        if self.object_cache:
+            self.object_cache.remove(object_.id)
+            self.get_pending_objects()[object_.id] = object_
 
-        return Object(self, id, class_, **attributes)
+    def evict_objects(self, ids: list):
+        """ Entfernt Objekte, die ohne Objektinstanz geschrieben wurden, aus dem Objektcache, nach dem Commit erneut (falls ein anderer Thread zwischenzeitlich den alten Stand abgelegt hat) """
+        if self.object_cache:
+            pending_objects = self.get_pending_objects()
+            for id in ids:
+                self.object_cache.remove(id)
+                pending_objects[id] = None
 
-    def get_object(self, id: str, class_: Class) -> Object:
+    def evict_class_objects(self, class_: Class):
+        """ Entfernt alle Objekte der Klasse und ihrer Unterklassen aus dem Objektcache, z.B. nach dem Ändern aller Zeilen der Klassentabelle """
+        if self.object_cache:
+            self.object_cache.remove_where(lambda o: class_.id in [c.id for c in o.get_class().get_family_tree()])
+
+    def get_cached_object(self, id: str) -> Object:
+        """ Gibt ein Objekt aus dem Objektcache zurück, Schreibzugriffe der laufenden Transaktion des aktuellen Threads haben Vorrang """
+        pending_objects = getattr(self.local, 'pending_objects', None)
+        if pending_objects and id in pending_objects:
+            return pending_objects[id]
+        return self.object_cache.get(id)
+
+    def get_read_filter(self, class_: Class, alias: str, enforce_permissions: bool) -> tuple:
+        """ Gibt eine an WHERE anzuhängende Bedingung samt Parametern zurück, die nur für den Benutzer lesbare Zeilen der View zulässt """
+        if not enforce_permissions:
+            return '', ()
+        str_groups = f'WITH RECURSIVE {USER_GROUP_IDS_CTE} SELECT id FROM c'
+        str_filter = f"""
+        AND (
+            EXISTS (SELECT 1 FROM permission.class_assignment AS ca WHERE ca.class_id = %s AND ca."read" AND ca.group_id IN ({str_groups}))
+            OR {alias}.id IN (SELECT oa.object_id FROM permission.object_assignment AS oa WHERE oa."read" AND oa.group_id IN ({str_groups}))
+        )"""
+        return str_filter, (class_.id, self.user.id, self.user.id)
+
+    @instrumented
+    @replica_fallback
+    def get_object(self, id: str, class_: Class, enforce_permissions: bool = False) -> Object:
         """ Gibt ein Objekt anhand der übergebenen ID und Klasse zurück """
-        cursor = self.get_connection().cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute(f'SELECT * FROM {class_.get_view_name()} WHERE id = %s', (id,))
+        if self.object_cache and not enforce_permissions:
+            object_ = self.get_cached_object(id)
+            if object_ and object_.get_class() is class_:
+                return object_
+        cursor = self.cursor(dict_rows=True, replica=True)
+        str_filter, filter_values = self.get_read_filter(class_, 'v', enforce_permissions)
+        cursor.execute(f'SELECT * FROM {class_.get_view_name()} AS v WHERE v.id = %s{str_filter}', (id, *filter_values))
         row = cursor.fetchone()
-        return Object(self, id, class_, **{a: v for a, v in row.items() if a != 'id'})
+        if not row:
+            return None
+        object_ = self.build_object(class_, row)
+        self.cache_object(object_)
+        return object_
 
-    def modify(self, object_, **attributes):
-        """ Aktualisiert die übergebenen Attribute des übergebenen Objekts """
-        query = []
+    @instrumented
+    def iter_objects(self, class_: Class, batch_size: int = 1000, enforce_permissions: bool = False):
+        """ Gibt einen Generator über alle Objekte der übergebenen Klasse zurück, die Zeilen werden blockweise über einen serverseitigen Cursor gelesen """
+        cursor = self.cursor(dict_rows=True, read_only=True, name=f'iter_{class_.name}_{uuid.uuid4().hex}')
+        cursor.itersize = batch_size
+        str_filter, filter_values = self.get_read_filter(class_, 'v', enforce_permissions)
+        try:
+            cursor.execute(f'SELECT * FROM {class_.get_view_name()} AS v WHERE TRUE{str_filter}', filter_values)
+            for row in cursor:
+                yield self.build_object(class_, row)
+        finally:
+            cursor.close()
+
+    def get_find_sql(self, class_: Class, where: dict = None, order_by: str | list = None, limit: int = None, after: Object = None, enforce_permissions: bool = False) -> tuple:
+        """ Erzeugt die parametrisierte Abfrage samt Parametern für find() """
+        layout = class_.get_layout()
+        conditions = []
         values = []
-        for current_class in object_.get_class().get_family_tree():
 
-            # Einzufügende Attribute ermitteln
+        # Bedingungen: {attribut: wert} oder {attribut: (operator, wert)}
+        for attribute, condition in (where or {}).items():
+            if attribute not in layout and attribute != 'id':
+                raise AttributeNotExists(attribute)
+            operator, value = condition if type(condition) is tuple else ('=', condition)
+            if operator not in FIND_OPERATORS:
+                raise ValueError(f'Nicht unterstützter Operator {operator} für Attribut {attribute}')
+            conditions.append(FIND_OPERATORS[operator].format(f'v.{attribute}'))
+            if operator == 'between':
+                values.extend(value)
+            elif operator in ('in', 'not in'):
+                values.append(list(value))
+            elif operator not in ('is null', 'is not null'):
+                values.append(value)
+
+        # Sortierung, '-' als Präfix sortiert absteigend, die ID dient als eindeutiges Abschlusskriterium
+        order = []
+        for attribute in ([order_by] if type(order_by) is str else order_by or []):
+            name = attribute.lstrip('-')
+            if name not in layout and name != 'id':
+                raise AttributeNotExists(name)
+            order.append((name, attribute.startswith('-')))
+        if not any(name == 'id' for name, _ in order):
+            order.append(('id', order[-1][1] if order else False))
+
+        # Keyset-Paginierung ab dem übergebenen Objekt, NULL steht wie bei ORDER BY aufsteigend am Ende und absteigend am Anfang
+        if after is not None:
+            after_values = [after.id if name == 'id' else after.get_value(name) for name, _ in order]
+            alternatives = []
+            if len({descending for _, descending in order}) == 1 and None not in after_values:
+                # Einheitliche Richtung ohne NULL: Zeilenvergleich, den ein Index auf die Sortierspalten direkt bedient
+                descending = order[0][1]
+                alternatives.append(f"({', '.join([f'v.{name}' for name, _ in order])}) {'<' if descending else '>'} ({', '.join(['%s'] * len(order))})")
+                values.extend(after_values)
+                for i, (name, _) in enumerate(order):
+                    if not descending and name != 'id':
+                        # Aufsteigend folgen noch Zeilen mit NULL in einer Sortierspalte, die der Zeilenvergleich nicht erfasst
+                        alternatives.append(f"({' AND '.join([*[f'v.{n} = %s' for n, _ in order[:i]], f'v.{name} IS NULL'])})")
+                        values.extend(after_values[:i])
+            else:
+                for i, (name, descending) in enumerate(order):
+                    value = after_values[i]
+                    if value is None and not descending:
+                        # Nach NULL folgt aufsteigend nichts mehr, nur Gleichstände der nächsten Spalten
+                        continue
+                    if value is None:
+                        str_next = f'v.{name} IS NOT NULL'
+                    elif descending:
+                        str_next = f'v.{name} < %s'
+                    else:
+                        str_next = f'(v.{name} > %s OR v.{name} IS NULL)'
+                    alternatives.append(f"({' AND '.join([*[f'v.{n} IS NOT DISTINCT FROM %s' for n, _ in order[:i]], str_next])})")
+                    values.extend(after_values[:i] if value is None else after_values[:i + 1])
+            conditions.append(f"({' OR '.join(alternatives) or 'FALSE'})")
+
+        str_filter, filter_values = self.get_read_filter(class_, 'v', enforce_permissions)
+        values.extend(filter_values)
+        str_order = ', '.join([f"v.{name}{' DESC' if descending else ''}" for name, descending in order])
+        sql = f"SELECT v.* FROM {class_.get_view_name()} AS v WHERE {' AND '.join(conditions) or 'TRUE'}{str_filter} ORDER BY {str_order}"
+        if limit is not None:
+            sql += ' LIMIT %s'
+            values.append(limit)
+        return sql, tuple(values)
+
+    @instrumented
+    @replica_fallback
+    def find(self, class_: Class, where: dict = None, order_by: str | list = None, limit: int = None, after: Object = None, enforce_permissions: bool = False) -> list:
+        """ Sucht Objekte der Klasse anhand von Attributbedingungen ({attribut: wert} oder {attribut: (operator, wert)}), sortiert nach order_by ('-' für absteigend) und blättert mit after ab dem letzten Objekt der vorherigen Seite """
+        sql, values = self.get_find_sql(class_, where, order_by, limit, after, enforce_permissions)
+        cursor = self.cursor(dict_rows=True, replica=True)
+        cursor.execute(sql, values)
+        return [self.build_object(class_, row) for row in cursor.fetchall()]
+
+    def get_modify_sql(self, class_: Class, update_attributes: tuple, placeholder: str = '${}') -> str:
+        """ Erzeugt eine einzelne Anweisung mit $n-Parametern (bzw. dem übergebenen Platzhalterformat), die die Attribute in allen betroffenen Klassentabellen aktualisiert """
+        queries = []
+        i = 2
+        for n, current_class in enumerate(class_.get_family_tree()):
+
+            # Zu aktualisierende Attribute ermitteln
             class_attributes = [a.name for a in current_class.get_assigned_attributes()]
-            insert_attributes = [a for a in attributes if a in class_attributes]
+            cols = [a for a in update_attributes if a in class_attributes]
+
+            # Teilquery erzeugen
+            if len(cols) > 0:
+                str_update = ', '.join([f'{a} = {placeholder.format(i + k)}' for k, a in enumerate(cols)])
+                i += len(cols)
+                queries.append(f'u{n} AS (UPDATE data.{current_class.name} SET {str_update} WHERE id = {placeholder.format(1)})')
+        return f"WITH {', '.join(queries)} SELECT 1"
 
-            # Query erzeugen
-            if len(insert_attributes) > 0:
-                str_update = ','.join([f'{a} = %s' for a in insert_attributes])
-                values.extend([attributes[key] for key in insert_attributes])
-                values.append(object_.id)
-                query.append(f'UPDATE data.{current_class.name} SET {str_update} WHERE id = %s;')
+    @instrumented
+    def modify(self, object_, **attributes):
+        """ Aktualisiert die übergebenen Attribute des übergebenen Objekts """
+        object_.check_attributes(attributes)
+        class_ = object_.get_class()
+        update_attributes = tuple(a for a in class_.get_layout() if a in attributes)
+        if len(update_attributes) == 0:
+            return
+        session = self.get_session()
+        if session:
+            session.add_modification(object_, attributes)
+            object_.set_values(**attributes)
+            self.cache_written_object(object_)
+            return
 
         # Query ausführen
-        cursor = self.get_connection().cursor()
-        cursor.execute('\n'.join(query), tuple(values))
+        cursor = self.cursor()
+        values = (object_.id, *[attributes[a] for a in update_attributes])
+        self.execute_prepared(cursor, ('modify', class_.id, update_attributes), lambda: self.get_modify_sql(class_, update_attributes), values)
+
+        # Objekt und Objektcache aktualisieren
+        object_.set_values(**attributes)
+        self.cache_written_object(object_)
+
+    @instrumented
+    def update_objects(self, changes: list, batch_size: int = 1000):
+        """ Aktualisiert mengenbasiert mehrere Objekte, changes ist eine Liste von (Objekt, Attribut-Dictionary), je Klassentabelle und Attributmenge wird ein UPDATE ... FROM (VALUES ...) ausgeführt """
 
+        # Änderungen nach Klassentabelle und Attributmenge gruppieren
+        groups = {}
+        for object_, attributes in changes:
+            for current_class in object_.get_class().get_family_tree():
+                cols = tuple(a.name for a in current_class.get_assigned_attributes() if a.name in attributes)
+                if len(cols) > 0:
+                    groups.setdefault((current_class, cols), []).append((object_.id, *[attributes[a] for a in cols]))
+
+        # Je Gruppe ein UPDATE ausführen, die Werte werden auf die Spaltentypen gecastet
+        cursor = self.cursor()
+        self.evict_objects([object_.id for object_, _ in changes])
+        for (current_class, cols), values in groups.items():
+            types = {a.name: a.generator for a in current_class.get_assigned_attributes()}
+            template = f"(%s::uuid, {', '.join([f'%s::{types[a]}' for a in cols])})"
+            str_set = ', '.join([f'{a} = v.{a}' for a in cols])
+            psycopg2.extras.execute_values(cursor, f"UPDATE data.{current_class.name} AS t SET {str_set} FROM (VALUES %s) AS v(id, {', '.join(cols)}) WHERE t.id = v.id",
+                                           values, template=template, page_size=batch_size)
+
+    @instrumented
     def bind(self, origin: Object, target: Object, reference: Reference | str, rebind: bool = False):
         """ Schafft eine Referenz vom Ursprungs- zum Zielobjekt """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         reference_name = reference.name if type(reference) is Reference else reference
         if rebind:
             cursor.execute(f'DELETE FROM reference.{reference_name} WHERE origin_id = %s', (origin.id,))
         if target is not None:
             cursor.execute(f'INSERT INTO reference.{reference_name} (origin_id, target_id) VALUES (%s, %s)', (origin.id, target.id))
 
+    @instrumented
     def unbind(self, origin: Object, target: Object, reference: Reference | str):
         """ Löscht eine bestehende Referenz vom Ursprungs- zum Zielobjekt """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         reference_name = reference.name if type(reference) is Reference else reference
         cursor.execute(f'DELETE FROM reference.{reference_name} WHERE origin_id = %s AND target_id = %s', (origin.id, target.id))
 
-    def hop(self, object_: Object, reference: Reference | str) -> list:
+    def get_reference_pairs_data(self, pairs: list) -> str:
+        """ Gibt die Paare (Ursprungsobjekt, Zielobjekt) als Daten für COPY in die temporäre Tabelle reference_pairs zurück, fehlende Ziele werden zu NULL """
+        return ''.join([f"{origin.id}\t{target.id if target is not None else NULL_COPY_VALUE}\n" for origin, target in pairs])
+
+    def get_bind_many_sql(self, reference_name: str, rebind: bool, on_conflict: str) -> list:
+        """ Erzeugt die Anweisungen, die die Paare aus reference_pairs mengenbasiert in die Referenztabelle übernehmen """
+        if on_conflict not in ('ignore', 'error'):
+            raise ValueError(f'Unbekannte Konfliktbehandlung {on_conflict}, erlaubt sind ignore und error')
+        queries = []
+        if rebind:
+            queries.append(f'DELETE FROM reference.{reference_name} AS r USING (SELECT DISTINCT origin_id FROM reference_pairs) AS p WHERE r.origin_id = p.origin_id')
+        queries.append(f"""
+        INSERT INTO reference.{reference_name} (origin_id, target_id)
+        SELECT DISTINCT origin_id, target_id FROM reference_pairs WHERE target_id IS NOT NULL
+        {'ON CONFLICT DO NOTHING' if on_conflict == 'ignore' else ''}
+        """)
+        return queries
+
+    def get_unbind_many_sql(self, reference_name: str) -> str:
+        """ Erzeugt die Anweisung, die die Paare aus reference_pairs mengenbasiert aus der Referenztabelle löscht """
+        return f'DELETE FROM reference.{reference_name} AS r USING reference_pairs AS p WHERE r.origin_id = p.origin_id AND r.target_id = p.target_id'
+
+    def copy_reference_pairs(self, cursor, pairs: list):
+        """ Lädt die Paare per COPY in die (je Verbindung einmal angelegte) temporäre Tabelle reference_pairs """
+        cursor.execute(REFERENCE_PAIRS_TABLE_QUERY)
+        cursor.execute('TRUNCATE reference_pairs')
+        cursor.copy_expert('COPY reference_pairs (origin_id, target_id) FROM STDIN', io.StringIO(self.get_reference_pairs_data(pairs)))
+
+    @instrumented
+    def bind_many(self, pairs: list, reference: Reference | str, rebind: bool = False, on_conflict: str = 'ignore'):
+        """ Schafft mengenbasiert Referenzen für eine Liste von Paaren (Ursprungsobjekt, Zielobjekt), mit rebind werden zuvor alle Referenzen der Ursprungsobjekte gelöscht, on_conflict ('ignore' oder 'error') regelt bereits bestehende Referenzen """
+        if len(pairs) == 0:
+            return
+        reference_name = reference.name if type(reference) is Reference else reference
+        queries = self.get_bind_many_sql(reference_name, rebind, on_conflict)
+        cursor = self.cursor()
+        self.copy_reference_pairs(cursor, pairs)
+        for query in queries:
+            cursor.execute(query)
+
+    @instrumented
+    def unbind_many(self, pairs: list, reference: Reference | str):
+        """ Löscht mengenbasiert die Referenzen einer Liste von Paaren (Ursprungsobjekt, Zielobjekt) """
+        if len(pairs) == 0:
+            return
+        reference_name = reference.name if type(reference) is Reference else reference
+        cursor = self.cursor()
+        self.copy_reference_pairs(cursor, pairs)
+        cursor.execute(self.get_unbind_many_sql(reference_name))
+
+    @instrumented
+    @replica_fallback
+    def hop(self, object_: Object, reference: Reference | str, enforce_permissions: bool = False) -> list:
         """ Gibt die mit dem übergebenen Objekte über die übergebene Referenz verbundenen Objekte zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor(dict_rows=True, replica=True)
         if type(reference) is str:
             reference = self.get_reference_by_name(reference)
-        cursor.execute(f'SELECT target_id FROM reference.{reference.name} WHERE origin_id = %s', (object_.id,))
-        return [self.get_object(row[0], reference.get_target_class()) for row in cursor.fetchall()]
+        target_class = reference.get_target_class()
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        cursor.execute(f'''
+        SELECT v.* FROM reference.{reference.name} AS r
+        JOIN {target_class.get_view_name()} AS v ON v.id = r.target_id
+        WHERE r.origin_id = %s{str_filter}
+        ''', (object_.id, *filter_values))
+        return [self.build_object(target_class, row) for row in cursor.fetchall()]
 
-    def hop1(self, object_: Object, reference: Reference | str) -> Object:
+    @instrumented
+    @replica_fallback
+    def hop1(self, object_: Object, reference: Reference | str, enforce_permissions: bool = False) -> Object:
         """ Gibt das erste mit dem übergebenen Objekte über die übergebene Referenz verbundene Objekt zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor(dict_rows=True, replica=True)
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        target_class = reference.get_target_class()
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        cursor.execute(f'''
+        SELECT v.* FROM reference.{reference.name} AS r
+        JOIN {target_class.get_view_name()} AS v ON v.id = r.target_id
+        WHERE r.origin_id = %s{str_filter}
+        LIMIT 1
+        ''', (object_.id, *filter_values))
+        row = cursor.fetchone()
+        return self.build_object(target_class, row) if row else None
+
+    @instrumented
+    @replica_fallback
+    def hop_many(self, objects: list, reference: Reference | str, enforce_permissions: bool = False) -> dict:
+        """ Gibt die mit den übergebenen Objekten über die übergebene Referenz verbundenen Objekte als Dictionary (Ursprungs-ID -> Objektliste) zurück """
+        cursor = self.cursor(replica=True)
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        target_class = reference.get_target_class()
+        result = {o.id: [] for o in objects}
+        if len(result) == 0:
+            return result
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        cursor.execute(f'''
+        SELECT r.origin_id, v.* FROM reference.{reference.name} AS r
+        JOIN {target_class.get_view_name()} AS v ON v.id = r.target_id
+        WHERE r.origin_id = ANY(%s::uuid[]){str_filter}
+        ''', (list(result), *filter_values))
+        cols = [d[0] for d in cursor.description[1:]]
+        for row in cursor.fetchall():
+            result[row[0]].append(self.build_object(target_class, dict(zip(cols, row[1:]))))
+        return result
+
+    @instrumented
+    @replica_fallback
+    def reverse_hop(self, object_: Object, reference: Reference | str, enforce_permissions: bool = False) -> list:
+        """ Gibt die Objekte zurück, die über die übergebene Referenz auf das übergebene Objekt verweisen """
+        cursor = self.cursor(dict_rows=True, replica=True)
         if type(reference) is str:
             reference = self.get_reference_by_name(reference)
-        cursor.execute(f'SELECT target_id FROM reference.{reference.name} WHERE origin_id = %s', (object_.id,))
-        return self.get_object(cursor.fetchone()[0], reference.get_target_class())
+        origin_class = reference.get_origin_class()
+        str_filter, filter_values = self.get_read_filter(origin_class, 'v', enforce_permissions)
+        cursor.execute(f'''
+        SELECT v.* FROM reference.{reference.name} AS r
+        JOIN {origin_class.get_view_name()} AS v ON v.id = r.origin_id
+        WHERE r.target_id = %s{str_filter}
+        ''', (object_.id, *filter_values))
+        return [self.build_object(origin_class, row) for row in cursor.fetchall()]
+
+    @instrumented
+    @replica_fallback
+    def reverse_hop_many(self, objects: list, reference: Reference | str, enforce_permissions: bool = False) -> dict:
+        """ Gibt die Objekte, die über die übergebene Referenz auf die übergebenen Objekte verweisen, als Dictionary (Ziel-ID -> Objektliste) zurück """
+        cursor = self.cursor(replica=True)
+        if type(reference) is str:
+            reference = self.get_reference_by_name(reference)
+        origin_class = reference.get_origin_class()
+        result = {o.id: [] for o in objects}
+        if len(result) == 0:
+            return result
+        str_filter, filter_values = self.get_read_filter(origin_class, 'v', enforce_permissions)
+        cursor.execute(f'''
+        SELECT r.target_id, v.* FROM reference.{reference.name} AS r
+        JOIN {origin_class.get_view_name()} AS v ON v.id = r.origin_id
+        WHERE r.target_id = ANY(%s::uuid[]){str_filter}
+        ''', (list(result), *filter_values))
+        cols = [d[0] for d in cursor.description[1:]]
+        for row in cursor.fetchall():
+            result[row[0]].append(self.build_object(origin_class, dict(zip(cols, row[1:]))))
+        return result
+
+    def get_traverse_sql(self, references: list, steps: list, target_class: Class, enforce_permissions: bool = False) -> tuple:
+        """ Erzeugt eine rekursive Abfrage samt Parametern, die ab den Startobjekten jeden zyklusfreien Pfad des Referenzpfads verfolgt und die erreichten Objekte der Zielklasse an den übergebenen Pfadschritten mit ihrer kleinsten Tiefe und ihrem ID-Pfad zurückgibt """
+        n = len(references)
+        str_edges = ' UNION ALL '.join([f'SELECT {i} AS step, origin_id, target_id FROM reference.{r.name}' for i, r in enumerate(references)])
+        str_step = f' AND e.step = mod(t.depth, {n})' if n > 1 else ''
+        str_target = f' AND mod(t.depth - 1, {n}) = ANY(%s)' if n > 1 else ''
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        sql = f'''
+        WITH RECURSIVE t AS (
+            SELECT s.id, 0 AS depth, ARRAY[s.id] AS path
+            FROM unnest(%s::uuid[]) AS s(id)
+            UNION ALL
+            SELECT e.target_id, t.depth + 1, t.path || e.target_id
+            FROM t
+            JOIN ({str_edges}) AS e ON e.origin_id = t.id{str_step}
+            WHERE t.depth < %s AND e.target_id <> ALL(t.path)
+        )
+        SELECT DISTINCT ON (v.id) t.depth, t.path::text[], v.*
+        FROM t
+        JOIN {target_class.get_view_name()} AS v ON v.id = t.id
+        WHERE t.depth > 0{str_target}{str_filter}
+        ORDER BY v.id, t.depth
+        '''
+        values = (list(steps),) if n > 1 else ()
+        return sql, (*values, *filter_values)
+
+    def get_traverse_step_sql(self, reference: Reference) -> str:
+        """ Erzeugt die Abfrage der über die Referenz erreichbaren IDs einer Ebene der Breitensuche """
+        return f'SELECT DISTINCT target_id FROM reference.{reference.name} WHERE origin_id = ANY(%s::uuid[])'
+
+    def get_traverse_objects_sql(self, target_class: Class, enforce_permissions: bool = False) -> tuple:
+        """ Erzeugt die Abfrage samt Parametern, die die per Breitensuche erreichten Objekte der Zielklasse lädt """
+        str_filter, filter_values = self.get_read_filter(target_class, 'v', enforce_permissions)
+        return f'SELECT v.* FROM {target_class.get_view_name()} AS v WHERE v.id = ANY(%s::uuid[]){str_filter}', filter_values
+
+    def get_traverse_plan(self, path_or_reference: list | Reference | str, max_depth: int = None) -> tuple:
+        """ Gibt die Referenzen des Pfads, die effektive maximale Tiefe und die Pfadschritte je Zielklasse zurück """
+        references = [self.get_reference_by_name(r) if type(r) is str else r for r in (path_or_reference if type(path_or_reference) is list else [path_or_reference])]
+        steps = {}
+        for i, reference in enumerate(references):
+            steps.setdefault(reference.get_target_class(), []).append(i)
+        return references, max_depth if max_depth is not None else len(references), steps
+
+    def expand_traverse_frontier(self, target_ids: list, depth: int, references: list, visited: set, reached: dict) -> list:
+        """ Gibt die noch nicht besuchten IDs der nächsten Ebene zurück und merkt sie samt Tiefe für die Zielklasse des Pfadschritts vor """
+        n = len(references)
+        frontier = [id for id in target_ids if (id, (depth + 1) % n) not in visited]
+        visited.update([(id, (depth + 1) % n) for id in frontier])
+        target_class = references[depth % n].get_target_class()
+        for id in frontier:
+            reached[target_class].setdefault(id, depth + 1)
+        return frontier
+
+    @instrumented
+    @replica_fallback
+    def traverse(self, start: Object | list, path_or_reference: list | Reference | str, max_depth: int = None, with_paths: bool = False, enforce_permissions: bool = False) -> list:
+        """ Verfolgt ab dem Startobjekt (oder einer Liste von Startobjekten) eine Referenz oder einen Referenzpfad bis max_depth Schritte (Standard: Pfadlänge, ein Pfad wird zyklisch wiederholt) und gibt die erreichten Objekte nach Tiefe sortiert zurück, mit with_paths als (Objekt, ID-Pfad) """
+        references, max_depth, steps = self.get_traverse_plan(path_or_reference, max_depth)
+        start_ids = [o.id for o in (start if type(start) is list else [start])]
+        result = []
+        if len(start_ids) == 0 or max_depth < 1:
+            return result
+        cursor = self.cursor(replica=True)
+
+        if with_paths:
+            # Eine rekursive Abfrage je Zielklasse, da jede Zielklasse eine eigene View hat, bei Selbstreferenzen also genau eine
+            for target_class, class_steps in steps.items():
+                sql, values = self.get_traverse_sql(references, class_steps, target_class, enforce_permissions)
+                cursor.execute(sql, (start_ids, max_depth, *values))
+                cols = [d[0] for d in cursor.description[2:]]
+                for row in cursor.fetchall():
+                    result.append((row[0], self.build_object(target_class, dict(zip(cols, row[2:]))), row[1]))
+        else:
+            # Breitensuche Ebene für Ebene: jedes Objekt wird je Pfadschritt höchstens einmal erweitert, der Aufwand bleibt bei O(Kanten)
+            visited = set()
+            reached = {target_class: {} for target_class in steps}
+            frontier = start_ids
+            for depth in range(max_depth):
+                cursor.execute(self.get_traverse_step_sql(references[depth % len(references)]), (frontier,))
+                frontier = self.expand_traverse_frontier([row[0] for row in cursor.fetchall()], depth, references, visited, reached)
+                if len(frontier) == 0:
+                    break
+            for target_class, depths in reached.items():
+                if len(depths) == 0:
+                    continue
+                sql, values = self.get_traverse_objects_sql(target_class, enforce_permissions)
+                cursor.execute(sql, (list(depths), *values))
+                cols = [d[0] for d in cursor.description]
+                for row in cursor.fetchall():
+                    object_ = self.build_object(target_class, dict(zip(cols, row)))
+                    result.append((depths[object_.id], object_, None))
+        result.sort(key=lambda r: r[0])
+        return [(object_, path) for _, object_, path in result] if with_paths else [object_ for _, object_, _ in result]
+
+    ################################################## Export/Import ##################################################
+    def get_copy_options(self, format: str) -> str:
+        """ Gibt die COPY-Optionen für das Format 'csv' oder 'binary' zurück """
+        if format == 'csv':
+            return '(FORMAT csv, HEADER true)'
+        elif format == 'binary':
+            return '(FORMAT binary)'
+        raise ValueError(f'Unbekanntes Format {format}, erlaubt sind csv und binary')
+
+    def get_export_select_sql(self, class_: Class) -> str:
+        """ Erzeugt die Abfrage der Objekte genau dieser Klasse (ohne Unterklassen) mit allen Attributen des Stammbaums und dem Erstellungszeitpunkt """
+        return f'SELECT v.*, m.created AS meta_created FROM ({self.get_class_select_sql(class_)}) AS v JOIN data.meta AS m ON m.id = v.id WHERE m.class_id = %s'
+
+    def get_structure_definition(self, classes: list, references: list, cursor=None) -> dict:
+        """ Beschreibt Klassen (samt Stammbaum), Attribute, Attributzuweisungen und Referenzen als JSON-fähiges Dictionary, optional über den übergebenen Cursor """
+        family = {}
+        for class_ in [*classes, *[c for r in references for c in (r.get_origin_class(), r.get_target_class())]]:
+            for current_class in class_.get_family_tree():
+                family[current_class.id] = current_class
+        cursor = cursor or self.cursor(read_only=True)
+        cursor.execute('''
+        SELECT c.name, a.name, a.generator, a.indexed, aa.nullable, aa."default"
+        FROM structure.attribute_assignment AS aa
+        JOIN structure.class AS c ON c.id = aa.class_id
+        JOIN structure.attribute AS a ON a.id = aa.attribute_id
+        WHERE aa.class_id = ANY(%s::uuid[])
+        ''', (list(family),))
+        assignments = cursor.fetchall()
+        return {
+            'classes': [{'name': c.name, 'parent': c.get_parent().name if c.parent_id else None, 'view_mode': c.view_mode, 'partitions': c.partitions}
+                        for c in sorted(family.values(), key=lambda c: len(c.get_family_tree()))],
+            'attributes': list({row[1]: {'name': row[1], 'generator': row[2], 'indexed': row[3]} for row in assignments}.values()),
+            'assignments': [{'class': row[0], 'attribute': row[1], 'nullable': row[4], 'default': row[5]} for row in assignments],
+            'references': [{'name': r.name, 'origin': r.get_origin_class().name, 'target': r.get_target_class().name} for r in references]
+        }
+
+    @contextmanager
+    def export_snapshot(self):
+        """ Stellt einen Cursor auf einer eigenen Verbindung mit einer REPEATABLE READ-Transaktion bereit, damit Struktur, Objekte und Kanten eines Exports zueinander passen """
+        connection = self.checkout()
+        try:
+            connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            yield connection.cursor()
+        finally:
+            if not connection.closed:
+                connection.rollback()
+                connection.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+            self.connection_pool.putconn(connection, close=bool(connection.closed))
+
+    def write_export(self, cursor, directory: str, classes: list, references: list, format: str = 'csv'):
+        """ Schreibt Struktur (structure.json), die Objekte der Klassen und die Kanten der Referenzen per COPY ... TO STDOUT blockweise in Dateien des Verzeichnisses, alles über den Cursor des Snapshots """
+        options = self.get_copy_options(format)
+        os.makedirs(directory, exist_ok=True)
+        definition = self.get_structure_definition(classes, references, cursor)
+        definition['format'] = format
+        definition['data'] = {'classes': {}, 'references': [r.name for r in references]}
+
+        # Objekte je Klasse, die Spaltenreihenfolge wird für den Import festgehalten
+        for class_ in classes:
+            definition['data']['classes'][class_.name] = ['id', *class_.get_layout(), 'meta_created']
+            query = cursor.mogrify(self.get_export_select_sql(class_), (class_.id,)).decode()
+            with open(os.path.join(directory, f'class.{class_.name}.{format}'), 'wb') as file:
+                cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH {options}', file)
+
+        # Kanten je Referenz
+        for reference in references:
+            with open(os.path.join(directory, f'reference.{reference.name}.{format}'), 'wb') as file:
+                cursor.copy_expert(f'COPY reference.{reference.name} (origin_id, target_id) TO STDOUT WITH {options}', file)
+
+        with open(os.path.join(directory, 'structure.json'), 'w') as file:
+            json.dump(definition, file, indent=2)
+
+    @instrumented
+    def export_data(self, directory: str, classes: list, references: list, format: str = 'csv'):
+        """ Exportiert die übergebenen Klassen und Referenzen aus einem gemeinsamen Snapshot in das Verzeichnis """
+        with self.export_snapshot() as cursor:
+            self.write_export(cursor, directory, classes, references, format)
+
+    @instrumented
+    def export_class(self, class_: Class, directory: str, format: str = 'csv', references: bool = True):
+        """ Exportiert die Objekte der Klasse samt Struktur und, mit references, die von der Klasse ausgehenden Referenzen in das Verzeichnis """
+        with self.export_snapshot() as cursor:
+            class_references = []
+            if references:
+                # Die Referenzen werden im selben Snapshot ermittelt wie die exportierten Daten
+                cursor.execute('SELECT name FROM structure.reference WHERE origin_class_id = %s', (class_.id,))
+                class_references = [self.get_reference_by_name(row[0]) for row in cursor.fetchall()]
+            self.write_export(cursor, directory, [class_], class_references, format)
+
+    @instrumented
+    def export_schema(self, directory: str, format: str = 'csv'):
+        """ Exportiert alle Klassen, Objekte und Referenzen in das Verzeichnis """
+        with self.export_snapshot() as cursor:
+            cursor.execute('SELECT name FROM structure.class')
+            classes = [self.get_class_by_name(row[0]) for row in cursor.fetchall()]
+            cursor.execute('SELECT name FROM structure.reference')
+            references = [self.get_reference_by_name(row[0]) for row in cursor.fetchall()]
+            self.write_export(cursor, directory, classes, references, format)
+
+    def apply_structure_definition(self, definition: dict):
+        """ Legt fehlende Klassen, Attribute, Attributzuweisungen und Referenzen der Definition an, vorhandene Elemente werden anhand des Namens übernommen """
+        attributes = {a['name']: a for a in definition['attributes']}
+        created = []
+        for c in definition['classes']:
+            class_ = self.get_class_by_name(c['name'])
+            if class_ is None:
+                class_ = self.create_class(c['name'], self.get_class_by_name(c['parent']) if c['parent'] else None, c['partitions'])
+                created.append((class_, c['view_mode']))
+        for a in definition['assignments']:
+            class_ = self.get_class_by_name(a['class'])
+            attribute = self.get_attribute_by_name(a['attribute'])
+            if attribute is None:
+                attribute = self.create_attribute(a['attribute'], attributes[a['attribute']]['generator'], attributes[a['attribute']]['indexed'])
+            if attribute not in class_.get_assigned_attributes():
+                self.assign_attribute(attribute, class_, a['nullable'], a['default'])
+        for class_, view_mode in created:
+            if view_mode == 'view':
+                self.update_class_view(class_)
+            else:
+                self.set_class_view_mode(class_, view_mode)
+        for r in definition['references']:
+            if self.get_reference_by_name(r['name']) is None:
+                self.create_reference(r['name'], self.get_class_by_name(r['origin']), self.get_class_by_name(r['target']))
+
+    @instrumented
+    def import_data(self, directory: str):
+        """ Baut die Struktur aus structure.json auf und lädt Objekte und Referenzkanten des Verzeichnisses per COPY ... FROM STDIN, die Objekte behalten ihre IDs """
+        with open(os.path.join(directory, 'structure.json'), 'r') as file:
+            definition = json.load(file)
+        format = definition['format']
+        options = self.get_copy_options(format)
+        with self.transaction():
+            self.apply_structure_definition(definition)
+            cursor = self.cursor()
+
+            # Objekte je Klasse über eine temporäre Tabelle auf Metadaten und Klassentabellen verteilen
+            for name, columns in definition['data']['classes'].items():
+                class_ = self.get_class_by_name(name)
+                query = cursor.mogrify(self.get_export_select_sql(class_), (class_.id,)).decode()
+                cursor.execute(f'CREATE TEMP TABLE import_rows AS {query} WITH NO DATA')
+                with open(os.path.join(directory, f'class.{name}.{format}'), 'rb') as file:
+                    cursor.copy_expert(f"COPY import_rows ({', '.join(columns)}) FROM STDIN WITH {options}", file)
+                cursor.execute('INSERT INTO data.meta (id, class_id, creator_id, created) SELECT id, %s, %s, meta_created FROM import_rows', (class_.id, self.user.id))
+                if self.object_cache:
+                    cursor.execute('SELECT id FROM import_rows')
+                    self.evict_objects([row[0] for row in cursor.fetchall()])
+                for current_class in class_.get_family_tree():
+                    str_cols = ', '.join(['id', *[a.name for a in current_class.get_assigned_attributes()]])
+                    cursor.execute(f'INSERT INTO data.{current_class.name} ({str_cols}) SELECT {str_cols} FROM import_rows')
+                cursor.execute('DROP TABLE import_rows')
+                if class_.view_mode == 'materialized':
+                    self.refresh_class_view(class_, concurrently=False)
+
+            # Referenzkanten, deren Objekte nicht vorhanden sind (z.B. Ziele außerhalb eines Klassenexports), werden übergangen
+            for name in definition['data']['references']:
+                cursor.execute(REFERENCE_PAIRS_TABLE_QUERY)
+                cursor.execute('TRUNCATE reference_pairs')
+                with open(os.path.join(directory, f'reference.{name}.{format}'), 'rb') as file:
+                    cursor.copy_expert(f'COPY reference_pairs (origin_id, target_id) FROM STDIN WITH {options}', file)
+                cursor.execute(f'''
+                INSERT INTO reference.{name} (origin_id, target_id)
+                SELECT p.origin_id, p.target_id FROM reference_pairs AS p
+                WHERE EXISTS (SELECT 1 FROM data.meta AS m WHERE m.id = p.origin_id) AND EXISTS (SELECT 1 FROM data.meta AS m WHERE m.id = p.target_id)
+                ON CONFLICT DO NOTHING
+                ''')
+
+    def import_class(self, directory: str):
+        """ Importiert einen mit export_class() erstellten Export """
+        self.import_data(directory)
+
+    def import_schema(self, directory: str):
+        """ Importiert einen mit export_schema() erstellten Export """
+        self.import_data(directory)
 
     ################################################## Berechtigungen ##################################################
+    @instrumented
     def create_group(self, name: str, parent: Group = None) -> Group:
         """ Erstellt eine neue Benutzergruppe mit dem übergebenen Namen und gibt ein Group-Objekt zurück """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         if parent:
             cursor.execute('INSERT INTO permission.group (name, parent_id) VALUES (%s, %s) RETURNING id', (name, parent.id))
         else:
             cursor.execute('INSERT INTO permission.group (name) VALUES (%s) RETURNING id', (name,))
         return Group(self, cursor.fetchone()[0], name, parent.id if parent else None)
         
+    @instrumented
     def add_user_to_group(self, user: User, group: Group):
         """ Weist den übergebenen Benutzer der übergebenen Benutzergruppe zu """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         cursor.execute('INSERT INTO permission.user_assignment (user_id, group_id) VALUES (%s, %s)', (user.id, group.id))
 
+    @instrumented
     def assign_class_to_group(self, class_: Class, group: Group, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
         """ Weist die übergeben Klasse der übergebenen Benutzergruppe zu """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         cursor.execute('INSERT INTO permission.class_assignment (class_id, group_id, "read", write, "delete", administration) VALUES (%s, %s, %s, %s, %s, %s)', (class_.id, group.id, read, write, delete, administration))
 
+    @instrumented
     def assign_object_to_group(self, object: Object, group: Group, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
         """ Weist das übergebene Object der übergebenen Benutzergruppe zu """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         cursor.execute('INSERT INTO permission.object_assignment (object_id, group_id, "read", write, "delete", administration) VALUES (%s, %s, %s, %s, %s, %s)', (object.id, group.id, read, write, delete, administration))
 
+    @instrumented
     def assign_reference_to_group(self, reference: Reference, group: Group, read: bool = False, write: bool = False, delete: bool = False, administration: bool = False):
         """ Weist die übergeben Referenz der übergebenen Benutzergruppe zu """
-        cursor = self.get_connection().cursor()
+        cursor = self.cursor()
         cursor.execute('INSERT INTO permission.reference_assignment (reference_id, group_id, "read", write, "delete", administration) VALUES (%s, %s, %s, %s, %s, %s)', (reference.id, group.id, read, write, delete, administration))
 
+    @instrumented
+    @replica_fallback
     def get_users_groups_from_db(self, user: User):
         """ Gibt die dem Benutzer zugewiesenen Gruppen sowie die untergeordneten Gruppen mittels Datenbankabfrage zurück """
-        cursor = self.get_connection().cursor()
-        cursor.execute("""
-        WITH RECURSIVE c AS (
-            SELECT g.id, g.name, g.parent_id FROM permission.user_assignment as ua
-            JOIN permission.group as g ON g.id = ua.group_id
-            WHERE ua.user_id = %s
-            UNION ALL
-            SELECT g.id, g.name, g.parent_id
-            FROM permission.group AS g
-            JOIN c ON c.id = g.parent_id
-        )
-        SELECT * FROM c;
-        """, (user.id,))
+        cursor = self.cursor(replica=True)
+        cursor.execute(USER_GROUPS_QUERY, (user.id,))
         groups = []
         for row in cursor.fetchall():
             groups.append(Group(self, row[0], row[1], row[2]))
         return groups
     
+    @instrumented
+    @replica_fallback
     def get_users_classes_from_db(self, user: User):
         """ Gibt die dem Benutzer über Gruppen zugewiesenen Objektklassen zurück """
-        cursor = self.get_connection().cursor()
-        cursor.execute("""
-        WITH RECURSIVE c AS (
-            SELECT g.id FROM permission.user_assignment as ua
-            JOIN permission.group as g ON g.id = ua.group_id
-            WHERE ua.user_id = %s
-            UNION ALL
-            SELECT g.id
-            FROM permission.group AS g
-            JOIN c ON c.id = g.parent_id
-        )               
-        SELECT * FROM permission.class_assignment WHERE group_id IN (SELECT id FROM c)
-        """, (user.id,))
-        classes = []
+        cursor = self.cursor(replica=True)
+        cursor.execute(USER_CLASSES_QUERY, (user.id,))
+        return [self.get_class_by_id(row[0]) for row in cursor.fetchall()]
+
+    @instrumented
+    @replica_fallback
+    def load_permissions_from_db(self, user: User) -> PermissionCache:
+        """ Ermittelt die effektiven Klassen-, Referenz- und Objektrechte des Benutzers über die Gruppenhierarchie in einer Abfrage """
+        cursor = self.cursor(replica=True)
+        cursor.execute(EFFECTIVE_PERMISSIONS_QUERY, (user.id,))
+        permission_cache = PermissionCache(self.permission_ttl)
         for row in cursor.fetchall():
-            print(*row)
\ No newline at end of file
+            permission_cache.store_permissions(row[0], row[1], row[2], row[3])
+        return permission_cache
+
+    def get_permissions(self) -> PermissionCache:
+        """ Gibt die effektiven Rechte des Benutzers der Schnittstelle zurück, nach Ablauf der Lebensdauer werden sie neu geladen """
+        if self.permission_cache is None or self.permission_cache.is_expired():
+            self.permission_cache = self.load_permissions_from_db(self.user)
+        return self.permission_cache
+
+    def check_class_permission(self, class_: Class, permission: int = PERMISSION_READ) -> bool:
+        """ Gibt zurück, ob der Benutzer die Rechte der übergebenen Bitmaske auf die Klasse besitzt """
+        return self.get_permissions().allows_class(class_.id, permission)
+
+    def check_reference_permission(self, reference: Reference, permission: int = PERMISSION_READ) -> bool:
+        """ Gibt zurück, ob der Benutzer die Rechte der übergebenen Bitmaske auf die Referenz besitzt """
+        return self.get_permissions().allows_reference(reference.id, permission)
+
+    def check_object_permission(self, object_: Object, permission: int = PERMISSION_READ) -> bool:
+        """ Gibt zurück, ob der Benutzer die Rechte der übergebenen Bitmaske auf das Objekt besitzt, Klassenrechte gelten für alle Objekte der Klasse """
+        return self.get_permissions().allows_object(object_.id, object_.get_class().id, permission)
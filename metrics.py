@@ -0,0 +1,260 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+import psycopg2.extensions
+import psycopg2.extras
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Aktuell laufende Schnittstellenmethode als (Metrics, Name), gilt für den Thread bzw. die asyncio-Task
+current_operation = contextvars.ContextVar('sqlobint_current_operation', default=None)
+logger = logging.getLogger('sqlobint')
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'maximum')
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        """ Zählt einen Messwert in den passenden Bucket """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def dump(self) -> dict:
+        """ Gibt Anzahl, Summe, Maximum und die kumulierten Buckets (Obergrenze in Sekunden -> Anzahl) zurück """
+        buckets = {}
+        cumulated = 0
+        for bound, count in zip((*self.bounds, float('inf')), self.counts):
+            cumulated += count
+            buckets[bound] = cumulated
+        return {'count': self.count, 'sum': self.total, 'max': self.maximum, 'buckets': buckets}
+
+class OperationMetrics:
+    __slots__ = ('calls', 'errors', 'statements', 'round_trips', 'rows', 'latency', 'statement_latency')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.statements = 0
+        self.round_trips = 0
+        self.rows = 0
+        self.latency = Histogram()
+        self.statement_latency = Histogram()
+
+    def dump(self) -> dict:
+        """ Gibt die Zähler und Histogramme als Dictionary zurück """
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'statements': self.statements,
+            'round_trips': self.round_trips,
+            'rows': self.rows,
+            'statements_per_call': self.statements / self.calls if self.calls else None,
+            'latency': self.latency.dump(),
+            'statement_latency': self.statement_latency.dump()
+        }
+
+class Metrics:
+    def __init__(self, slow_query_threshold: float = None) -> None:
+        self.slow_query_threshold = slow_query_threshold
+        self.operations = {}
+        self.pool_wait = Histogram()
+        self.lock = threading.Lock()
+
+    def get_operation(self, name: str) -> OperationMetrics:
+        """ Gibt die Metriken einer Operation zurück und legt sie bei Bedarf an """
+        operation = self.operations.get(name)
+        if operation is None:
+            with self.lock:
+                operation = self.operations.setdefault(name, OperationMetrics())
+        return operation
+
+    def record_call(self, name: str, duration: float, failed: bool = False) -> None:
+        """ Erfasst einen abgeschlossenen Aufruf einer Schnittstellenmethode """
+        operation = self.get_operation(name)
+        with self.lock:
+            operation.calls += 1
+            operation.errors += failed
+            operation.latency.observe(duration)
+
+    def record_statement(self, name: str, query, duration: float, rows: int, round_trips: int = 1) -> None:
+        """ Erfasst eine ausgeführte Anweisung, Anweisungen oberhalb des Schwellwerts werden als langsam protokolliert """
+        operation = self.get_operation(name)
+        with self.lock:
+            operation.statements += 1
+            operation.round_trips += round_trips
+            operation.rows += max(rows, 0)
+            operation.statement_latency.observe(duration)
+        if self.slow_query_threshold is not None and duration >= self.slow_query_threshold:
+            if isinstance(query, bytes):
+                query = query.decode(errors='replace')
+            logger.warning('Slow query in %s (%.1f ms, %d rows): %s', name, duration * 1000, rows, ' '.join(str(query).split()))
+
+    def record_pool_wait(self, duration: float) -> None:
+        """ Erfasst die Wartezeit auf eine Datenbankverbindung aus dem Connection Pool """
+        with self.lock:
+            self.pool_wait.observe(duration)
+
+    def snapshot(self) -> dict:
+        """ Gibt eine Momentaufnahme aller Metriken zurück """
+        with self.lock:
+            return {
+                'operations': {name: operation.dump() for name, operation in self.operations.items()},
+                'pool': {'wait': self.pool_wait.dump()}
+            }
+
+    def reset(self) -> None:
+        """ Setzt alle Metriken zurück """
+        with self.lock:
+            self.operations = {}
+            self.pool_wait = Histogram()
+
+def instrumented(method):
+    """ Erfasst Aufrufe, Dauer und die darin ausgeführten Anweisungen einer Schnittstellenmethode, verschachtelte Aufrufe werden der äußersten Methode zugerechnet """
+    name = method.__name__
+
+    def start(interface):
+        """ Gibt die Metrics der Schnittstelle zurück, falls der Aufruf erfasst werden soll (Metriken aktiv, keine äußere Operation) """
+        metrics = getattr(interface, 'metrics', None)
+        if metrics is None or current_operation.get() is not None:
+            return None
+        return metrics
+
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            metrics = start(self)
+            if metrics is None:
+                async for item in method(self, *args, **kwargs):
+                    yield item
+                return
+            generator = method(self, *args, **kwargs)
+            duration, failed = 0.0, False
+            try:
+                while True:
+                    current_operation.set((metrics, name))
+                    begin = time.perf_counter()
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except BaseException:
+                        failed = True
+                        raise
+                    finally:
+                        duration += time.perf_counter() - begin
+                        current_operation.set(None)
+                    yield item
+            finally:
+                await generator.aclose()
+                metrics.record_call(name, duration, failed)
+    elif inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            metrics = start(self)
+            if metrics is None:
+                return await method(self, *args, **kwargs)
+            current_operation.set((metrics, name))
+            begin = time.perf_counter()
+            failed = False
+            try:
+                return await method(self, *args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                current_operation.set(None)
+                metrics.record_call(name, time.perf_counter() - begin, failed)
+    elif inspect.isgeneratorfunction(method):
+        # Bei Generatoren zählt nur die Zeit innerhalb des Generators, zwischen den Schritten ist die Operation nicht aktiv
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = start(self)
+            if metrics is None:
+                yield from method(self, *args, **kwargs)
+                return
+            generator = method(self, *args, **kwargs)
+            duration, failed = 0.0, False
+            try:
+                while True:
+                    current_operation.set((metrics, name))
+                    begin = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        break
+                    except BaseException:
+                        failed = True
+                        raise
+                    finally:
+                        duration += time.perf_counter() - begin
+                        current_operation.set(None)
+                    yield item
+            finally:
+                generator.close()
+                metrics.record_call(name, duration, failed)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = start(self)
+            if metrics is None:
+                return method(self, *args, **kwargs)
+            current_operation.set((metrics, name))
+            begin = time.perf_counter()
+            failed = False
+            try:
+                return method(self, *args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                current_operation.set(None)
+                metrics.record_call(name, time.perf_counter() - begin, failed)
+    return wrapper
+
+def record_statement(query, begin: float, rowcount: int, round_trips: int = 1) -> None:
+    """ Rechnet eine ausgeführte Anweisung der aktuell laufenden Operation zu """
+    operation = current_operation.get()
+    if operation is not None:
+        metrics, name = operation
+        metrics.record_statement(name, query, time.perf_counter() - begin, rowcount, round_trips)
+
+class InstrumentedCursorMixin:
+    def execute(self, query, vars=None):
+        begin = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_statement(query, begin, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        begin = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_statement(query, begin, self.rowcount, len(vars_list))
+
+    def copy_expert(self, sql, file, size=8192):
+        begin = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_statement(sql, begin, self.rowcount)
+
+class InstrumentedCursor(InstrumentedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class InstrumentedRealDictCursor(InstrumentedCursorMixin, psycopg2.extras.RealDictCursor):
+    pass
@@ -0,0 +1,222 @@
+import time
+from exception import MigrationError
+
+class Migration:
+    """ Sammelt Strukturänderungen (Klassen, Attribute, Zuweisungen, Referenzen) und spielt sie mit apply() als geplante Migration ein """
+
+    def __init__(self, interface, batch_size: int = 10000, pause: float = 0.0, lock_timeout: str = '5s') -> None:
+        self.interface = interface
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lock_timeout = lock_timeout
+        self.classes = []
+        self.attributes = []
+        self.assignments = []
+        self.references = []
+
+    def create_class(self, name: str, parent: str = None, partitions: int = None, view_mode: str = 'view'):
+        """ Merkt eine neue Klasse vor, parent ist der Name einer bestehenden oder zuvor vorgemerkten Klasse """
+        self.classes.append((name, parent, partitions, view_mode))
+        return self
+
+    def create_attribute(self, name: str, generator: str, indexed: bool):
+        """ Merkt ein neues Attribut vor """
+        self.attributes.append((name, generator, indexed))
+        return self
+
+    def assign_attribute(self, attribute: str, class_: str, nullable: bool, default: str = None, backfill: bool = False):
+        """ Merkt eine Attributzuweisung vor, mit backfill wird ein (volatiler) Default nicht beim Hinzufügen der Spalte, sondern blockweise nachgetragen """
+        self.assignments.append((attribute, class_, nullable, default, backfill))
+        return self
+
+    def create_reference(self, name: str, origin_class: str, target_class: str):
+        """ Merkt eine neue Referenz vor """
+        self.references.append((name, origin_class, target_class))
+        return self
+
+    def plan(self) -> list:
+        """ Gibt die Schritte der Migration in Ausführungsreihenfolge als Beschreibungen zurück """
+        with self.interface.transaction():
+            return self.get_steps()
+
+    def get_steps(self) -> list:
+        """ Ermittelt die Schritte der Migration, benötigt eine offene Transaktion für Strukturabfragen """
+        steps = [f'create class {name}' for name, *_ in self.classes]
+        steps.extend(f'create attribute {name}' for name, *_ in self.attributes)
+        for attribute, class_, nullable, default, backfill in self.assignments:
+            steps.append(f"add column {class_}.{attribute}{' (default for new rows only)' if backfill else ''}")
+        steps.extend(f'create reference {name}' for name, *_ in self.references)
+        for attribute, class_, *_ in self.assignments:
+            if self.is_indexed(attribute):
+                steps.append(f'create index concurrently on {class_}.{attribute}')
+        for attribute, class_, nullable, default, backfill in self.assignments:
+            if backfill and default is not None:
+                steps.append(f'backfill {class_}.{attribute} in batches of {self.batch_size}')
+                if not nullable:
+                    steps.append(f'set {class_}.{attribute} not null via validated check constraint')
+        steps.extend(f'regenerate view of {name}' for name in self.get_affected_class_names())
+        return steps
+
+    def is_indexed(self, attribute: str) -> bool:
+        """ Gibt zurück, ob das (vorgemerkte oder bestehende) Attribut indiziert wird """
+        for name, generator, indexed in self.attributes:
+            if name == attribute:
+                return indexed
+        return self.interface.get_attribute_by_name(attribute).indexed
+
+    def get_class(self, name: str):
+        """ Gibt die Klasse anhand ihres Namens zurück, eine unbekannte Klasse bricht die Migration ab """
+        class_ = self.interface.get_class_by_name(name)
+        if class_ is None:
+            raise MigrationError(f'Klasse {name} existiert nicht')
+        return class_
+
+    def get_affected_class_names(self) -> list:
+        """ Gibt die Namen aller Klassen zurück, deren Views neu erzeugt werden müssen (neue und geänderte Klassen samt Unterklassen), übergeordnete Klassen zuerst """
+        names = [name for name, *_ in self.classes]
+        for attribute, class_, *_ in self.assignments:
+            if class_ not in names:
+                names.append(class_)
+        existing = [self.get_class(name) for name in names if name not in [c[0] for c in self.classes]]
+        if existing:
+            cursor = self.interface.cursor()
+            cursor.execute('''
+            WITH RECURSIVE d AS (
+                SELECT id, name, 0 AS depth FROM structure.class WHERE id = ANY(%s::uuid[])
+                UNION
+                SELECT c.id, c.name, d.depth + 1 FROM structure.class AS c JOIN d ON c.parent_id = d.id
+            )
+            SELECT name, MAX(depth) FROM d GROUP BY name ORDER BY MAX(depth)
+            ''', ([c.id for c in existing],))
+            for row in cursor.fetchall():
+                if row[0] not in names:
+                    names.append(row[0])
+        return names
+
+    def apply(self):
+        """ Führt die Migration aus: kurze DDL-Transaktion, Indizes mit CREATE INDEX CONCURRENTLY, gedrosseltes Nachtragen von Defaults, einmalige Neuerzeugung jeder betroffenen View """
+        interface = self.interface
+        if interface.in_transaction():
+            raise MigrationError('Migrationen können nicht innerhalb einer offenen Transaktion ausgeführt werden')
+
+        # 1. Struktur und Spalten in einer kurzen Transaktion, Sperren werden höchstens lock_timeout lang abgewartet
+        columns = []
+        with interface.transaction():
+            self.set_lock_timeout()
+            for name, parent, partitions, view_mode in self.classes:
+                interface.create_class(name, self.get_class(parent) if parent else None, partitions)
+            for name, generator, indexed in self.attributes:
+                interface.create_attribute(name, generator, indexed)
+            for attribute, class_, nullable, default, backfill in self.assignments:
+                column = (interface.get_attribute_by_name(attribute), self.get_class(class_), nullable, default, backfill)
+                interface.assign_attribute(*column[:4], index=False, backfill=backfill)
+                columns.append(column)
+            for name, origin_class, target_class in self.references:
+                interface.create_reference(name, self.get_class(origin_class), self.get_class(target_class))
+
+        # 2. Indizes ohne Schreibsperre
+        for attribute, class_, *_ in columns:
+            if attribute.indexed:
+                self.create_index_concurrently(attribute, class_)
+
+        # 3. Volatile Defaults blockweise nachtragen, danach ggf. NOT NULL setzen
+        for attribute, class_, nullable, default, backfill in columns:
+            if backfill and default is not None:
+                self.backfill(attribute, class_)
+                if not nullable:
+                    self.set_not_null(attribute, class_)
+
+        # 4. Jede betroffene View genau einmal neu erzeugen
+        view_modes = {name: view_mode for name, parent, partitions, view_mode in self.classes}
+        with interface.transaction():
+            for name in self.get_affected_class_names():
+                class_ = interface.get_class_by_name(name)
+                if name in view_modes and view_modes[name] != class_.view_mode:
+                    interface.set_class_view_mode(class_, view_modes[name])
+                else:
+                    interface.update_class_view(class_)
+
+        # Zwischengespeicherte Objekte geänderter Klassen haben das alte Layout bzw. vor dem Nachtragen gelesene Werte
+        for attribute, class_, *_ in columns:
+            interface.evict_class_objects(class_)
+
+    def set_lock_timeout(self):
+        """ Begrenzt in der laufenden Transaktion das Warten auf Sperren auf lock_timeout """
+        self.interface.cursor().execute('SELECT set_config(%s, %s, true)', ('lock_timeout', self.lock_timeout))
+
+    def execute_autocommit(self, queries: list):
+        """ Führt Anweisungen, die nicht in einem Transaktionsblock laufen dürfen, auf einer eigenen Verbindung im Autocommit-Modus aus """
+        interface = self.interface
+        connection = interface.checkout()
+        try:
+            connection.autocommit = True
+            cursor = connection.cursor()
+            for query in queries:
+                cursor.execute(query)
+        finally:
+            # Eine abgebrochene Verbindung wird nicht zurückgesetzt, sondern beim Zurückgeben geschlossen
+            if not connection.closed:
+                connection.autocommit = False
+            interface.connection_pool.putconn(connection, close=bool(connection.closed))
+
+    def create_index_concurrently(self, attribute, class_):
+        """ Indiziert die Spalte mit CREATE INDEX CONCURRENTLY, bei partitionierten Tabellen je Partition mit anschließendem Anhängen an den Index der Haupttabelle """
+        if not class_.partitions:
+            self.execute_autocommit(self.get_index_queries(attribute, class_, class_.name))
+            return
+        queries = [f'CREATE INDEX IF NOT EXISTS {class_.name}_{attribute.name} ON ONLY data.{class_.name}({attribute.name})']
+        for i in range(class_.partitions):
+            partition = f'{class_.name}_part_{i}'
+            queries.extend(self.get_index_queries(attribute, class_, partition))
+            queries.append(f'ALTER INDEX data.{class_.name}_{attribute.name} ATTACH PARTITION data.{partition}_{attribute.name}')
+        self.execute_autocommit(queries)
+
+    def get_index_queries(self, attribute, class_, table: str) -> list:
+        """ Gibt die Anweisungen zum nebenläufigen Indizieren der Tabelle zurück: keine bei bereits gültigem Index, ein von einem abgebrochenen Lauf übrig gebliebener ungültiger Index wird vorher entfernt """
+        interface = self.interface
+        index = f'data.{table}_{attribute.name}'
+        with interface.transaction():
+            cursor = interface.cursor(read_only=True)
+            cursor.execute('SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)', (index,))
+            row = cursor.fetchone()
+        if row is not None and row[0]:
+            return []
+        queries = [f'DROP INDEX CONCURRENTLY {index}'] if row is not None else []
+        return [*queries, interface.get_attribute_index_sql(attribute, class_, concurrently=True, table=table)]
+
+    def backfill(self, attribute, class_):
+        """ Setzt den Default in Blöcken von batch_size Zeilen entlang der ID, jeder Block wird einzeln committet, zwischen den Blöcken wird pause Sekunden gewartet """
+        interface = self.interface
+        last_id = None
+        while True:
+            with interface.transaction():
+                cursor = interface.cursor()
+                cursor.execute(f'''
+                WITH b AS (
+                    SELECT id FROM data.{class_.name} WHERE %(last_id)s::uuid IS NULL OR id > %(last_id)s::uuid ORDER BY id LIMIT %(batch_size)s
+                ), u AS (
+                    UPDATE data.{class_.name} AS t SET {attribute.name} = DEFAULT FROM b WHERE t.id = b.id AND t.{attribute.name} IS NULL
+                )
+                SELECT id FROM b ORDER BY id DESC LIMIT 1
+                ''', {'last_id': last_id, 'batch_size': self.batch_size})
+                row = cursor.fetchone()
+            if row is None:
+                return
+            last_id = row[0]
+            time.sleep(self.pause)
+
+    def set_not_null(self, attribute, class_):
+        """ Setzt NOT NULL über eine zunächst nicht validierte CHECK-Bedingung, deren Validierung Schreibzugriffe nicht blockiert """
+        constraint = f'{class_.name}_{attribute.name}_not_null'
+        interface = self.interface
+        with interface.transaction():
+            self.set_lock_timeout()
+            interface.cursor().execute(f'ALTER TABLE data.{class_.name} ADD CONSTRAINT {constraint} CHECK ({attribute.name} IS NOT NULL) NOT VALID')
+        with interface.transaction():
+            self.set_lock_timeout()
+            interface.cursor().execute(f'ALTER TABLE data.{class_.name} VALIDATE CONSTRAINT {constraint}')
+        with interface.transaction():
+            self.set_lock_timeout()
+            cursor = interface.cursor()
+            cursor.execute(f'ALTER TABLE data.{class_.name} ALTER COLUMN {attribute.name} SET NOT NULL')
+            cursor.execute(f'ALTER TABLE data.{class_.name} DROP CONSTRAINT {constraint}')
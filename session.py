@@ -0,0 +1,59 @@
+class Session:
+    def __init__(self, interface, batch_size: int = 1000) -> None:
+        self.interface = interface
+        self.batch_size = batch_size
+        self.created = {}
+        self.modified = {}
+
+    def add_creation(self, object_, attributes: dict) -> None:
+        """ Merkt ein neu erstelltes Objekt samt Attributen zum Einfügen vor """
+        self.created[object_.id] = (object_, dict(attributes))
+
+    def add_modification(self, object_, attributes: dict) -> None:
+        """ Merkt Attributänderungen vor, Änderungen an derselben Zeile werden zusammengeführt """
+        if object_.id in self.created:
+            self.created[object_.id][1].update(attributes)
+        elif object_.id in self.modified:
+            self.modified[object_.id][1].update(attributes)
+        else:
+            self.modified[object_.id] = (object_, dict(attributes))
+
+    def is_dirty(self, object_) -> bool:
+        """ Gibt zurück, ob für das Objekt noch nicht geschriebene Änderungen vorliegen """
+        return object_.id in self.created or object_.id in self.modified
+
+    def autoflush(self) -> None:
+        """ Schreibt vorgemerkte Erstellungen und Änderungen, bevor eine andere Anweisung sie in der Datenbank erwartet """
+        if self.created or self.modified:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Schreibt alle vorgemerkten Erstellungen und Änderungen gebündelt in die Datenbank """
+
+        # Vorgemerktes vorab übernehmen, die Anweisungen des Flushs lösen so kein erneutes Autoflush aus
+        created, modified = self.created, self.modified
+        self.created, self.modified = {}, {}
+
+        # Erstellungen je Klasse einfügen
+        classes = {}
+        for object_, attributes in created.values():
+            classes.setdefault(object_.get_class(), []).append((object_.id, attributes))
+        for class_, rows in classes.items():
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                self.interface.insert_objects(class_, [row[0] for row in batch], [row[1] for row in batch], self.batch_size)
+
+        # Änderungen einspielen
+        if len(modified) > 0:
+            self.interface.update_objects(list(modified.values()), self.batch_size)
+
+    def commit(self) -> None:
+        """ Schreibt alle vorgemerkten Änderungen und führt einen Commit durch """
+        self.flush()
+        self.interface.commit()
+
+    def rollback(self) -> None:
+        """ Verwirft alle vorgemerkten Änderungen und führt einen Rollback durch, die Objekte der Transaktion gelangen dadurch nicht in den Objektcache """
+        self.created.clear()
+        self.modified.clear()
+        self.interface.rollback()
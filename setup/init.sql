@@ -5,7 +5,9 @@ CREATE SCHEMA structure;
 CREATE TABLE structure.class (
     id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
     name VARCHAR(64) UNIQUE NOT NULL,
-    parent_id UUID REFERENCES structure.class(id)
+    parent_id UUID REFERENCES structure.class(id),
+    view_mode VARCHAR(16) NOT NULL DEFAULT 'view',
+    partitions INT
 );
 CREATE INDEX class_name ON structure.class(name);
 
@@ -36,6 +38,9 @@ CREATE TABLE structure.reference (
 );
 CREATE INDEX reference_name ON structure.reference(name);
 
+-- Strukturversion: Wird bei jeder Strukturänderung erhöht und mit der Benachrichtigung an andere Prozesse verschickt
+CREATE SEQUENCE structure.version;
+
 -- Schema Berechtigungen: Enthält Tabellen zur Verwaltung von Benutzern und Berechtigungsgruppen
 CREATE SCHEMA permission;
 
@@ -54,6 +59,7 @@ CREATE TABLE permission.group (
     parent_id UUID REFERENCES permission.group(id)
 );
 CREATE INDEX group_name ON permission.group(name);
+CREATE INDEX group_parent_id ON permission.group(parent_id);
 
 CREATE TABLE permission.user_assignment (
     user_id UUID REFERENCES permission.user(id),
@@ -70,6 +76,7 @@ CREATE TABLE permission.class_assignment (
     administration BOOLEAN NOT NULL,
     PRIMARY KEY (class_id, group_id)
 );
+CREATE INDEX class_assignment_group_id ON permission.class_assignment(group_id);
 
 CREATE TABLE permission.reference_assignment (
     reference_id UUID REFERENCES structure.reference(id),
@@ -80,6 +87,7 @@ CREATE TABLE permission.reference_assignment (
     administration BOOLEAN NOT NULL,
     PRIMARY KEY (reference_id, group_id)
 );
+CREATE INDEX reference_assignment_group_id ON permission.reference_assignment(group_id);
 
 -- Schema Referenzen: Enthält eine Tabelle für jede definierte Referenz, in welcher die Verbindungen zwischen Objekten abgelegt sind
 CREATE SCHEMA reference;
@@ -87,12 +95,13 @@ CREATE SCHEMA reference;
 -- Schema Daten: Enthält eine Tabelle für jede Objektklasse, in welcher die Daten abgelegt werden sowie eine Meta-Tabelle mit Grundlegenden Informationen zu jeden Objekt
 CREATE SCHEMA data;
 
+-- Die auskommentierte Hash-Partitionierung wird von setup_db() mit meta_partitions aktiviert
 CREATE TABLE data.meta (
     id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
     class_id UUID REFERENCES structure.class(id),
     creator_id UUID REFERENCES permission.user(id),
     created TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-);
+) /* PARTITION BY HASH (id) */;
 
 -- Objektzuweising zu einer Benutzergruppe: Kann aufgrund des Fremdschlüssels erst nach dem Definieren der Meta-Tabelle erzeugt werden
 CREATE TABLE permission.object_assignment (
@@ -104,6 +113,7 @@ CREATE TABLE permission.object_assignment (
     administration BOOLEAN NOT NULL,
     PRIMARY KEY (object_id, group_id)
 );
+CREATE INDEX object_assignment_group_id ON permission.object_assignment(group_id);
 
 -- Root-Benutzer erstellen und User-ID zurückgeben
 INSERT INTO permission.user(name) VALUES ('root') RETURNING id; 
\ No newline at end of file
@@ -0,0 +1,2 @@
+-- Ergänzt die Anzahl der Hash-Partitionen je Klasse (NULL: Klassentabelle nicht partitioniert)
+ALTER TABLE structure.class ADD COLUMN IF NOT EXISTS partitions INT;
@@ -0,0 +1,2 @@
+-- Ergänzt den View-Modus je Klasse ('view', 'materialized' oder 'table')
+ALTER TABLE structure.class ADD COLUMN IF NOT EXISTS view_mode VARCHAR(16) NOT NULL DEFAULT 'view';
@@ -0,0 +1,5 @@
+-- Legt die Indizes an, über die Gruppenhierarchie und Rechtezuweisungen beim Filtern nach Leserechten aufgelöst werden
+CREATE INDEX IF NOT EXISTS group_parent_id ON permission.group(parent_id);
+CREATE INDEX IF NOT EXISTS class_assignment_group_id ON permission.class_assignment(group_id);
+CREATE INDEX IF NOT EXISTS reference_assignment_group_id ON permission.reference_assignment(group_id);
+CREATE INDEX IF NOT EXISTS object_assignment_group_id ON permission.object_assignment(group_id);
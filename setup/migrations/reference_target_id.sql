@@ -0,0 +1,10 @@
+-- Legt für bestehende Referenztabellen den Index auf target_id an
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN SELECT name FROM structure.reference LOOP
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON reference.%I(target_id)', r.name || '_target_id', r.name);
+    END LOOP;
+END
+$$;
@@ -0,0 +1,2 @@
+-- Ergänzt die Strukturversion, die bei jeder Strukturänderung erhöht und mit der Benachrichtigung verschickt wird
+CREATE SEQUENCE IF NOT EXISTS structure.version;
@@ -0,0 +1,54 @@
+# Die Tests benötigen eine Wegwerf-Datenbank: setup_db() leert die Schemata der in SQLOBINT_TEST_DSN angegebenen Datenbank
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+
+from psycopg2 import pool
+from interface import UserInterface, setup_db
+
+DSN = os.environ.get('SQLOBINT_TEST_DSN')
+
+
+@pytest.fixture
+def connection_pool():
+    """ Connection Pool der Testdatenbank, ohne SQLOBINT_TEST_DSN werden die Tests übersprungen """
+    if not DSN:
+        pytest.skip('SQLOBINT_TEST_DSN ist nicht gesetzt')
+    connection_pool = pool.ThreadedConnectionPool(1, 10, DSN)
+    yield connection_pool
+    connection_pool.closeall()
+
+
+@pytest.fixture
+def root_user(connection_pool):
+    """ Initialisiert die Testdatenbank und gibt den Root-Benutzer zurück """
+    connection = connection_pool.getconn()
+    try:
+        return setup_db(connection, os.path.join(ROOT, 'setup', 'init.sql'))
+    finally:
+        connection_pool.putconn(connection)
+
+
+@pytest.fixture
+def interface(root_user, connection_pool):
+    interface = UserInterface(root_user, connection_pool)
+    yield interface
+    interface.disconnect()
+
+
+@pytest.fixture
+def schema(interface):
+    """ Legt Personen und Adressen samt der Referenz person_to_address an """
+    with interface.transaction():
+        c_object = interface.create_class('object')
+        c_person = interface.create_class('person', c_object)
+        c_address = interface.create_class('address', c_object)
+        interface.assign_attribute(interface.create_attribute('first_name', 'VARCHAR(100)', False), c_person, True)
+        interface.assign_attribute(interface.create_attribute('city', 'VARCHAR(100)', False), c_address, True)
+        for class_ in (c_object, c_person, c_address):
+            class_.update_view()
+        interface.create_reference('person_to_address', c_person, c_address)
+    return c_person, c_address
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from conftest import DSN
+
+pytest.importorskip('psycopg')
+pytest.importorskip('psycopg_pool')
+
+from psycopg_pool import AsyncConnectionPool
+from async_interface import AsyncUserInterface
+
+
+@pytest.fixture
+def run_async(root_user, schema):
+    """ Führt eine Coroutine-Funktion mit einer AsyncUserInterface auf der initialisierten Testdatenbank aus """
+
+    def run_async(function, **kwargs):
+        async def main():
+            async with AsyncConnectionPool(DSN, min_size=1, max_size=4, open=False) as connection_pool:
+                interface = AsyncUserInterface(root_user, connection_pool, **kwargs)
+                await interface.load_structure()
+                return await function(interface)
+        return asyncio.run(main())
+    return run_async
+
+
+def test_async_create_object_and_modify(run_async):
+
+    async def create_and_modify(interface):
+        c_person = interface.get_class_by_name('person')
+        person = await interface.create_object(c_person, first_name='Fred')
+        await interface.modify(person, first_name='Frederik')
+        async with interface.transaction():
+            # Die vorbereiteten Anweisungen werden auf derselben Verbindung erneut verwendet
+            second = await interface.create_object(c_person, first_name='Wilma')
+            await interface.modify(second, first_name='Wilhelmine')
+        return [(await interface.get_object(o.id, c_person)).get_value('first_name') for o in (person, second)]
+    assert run_async(create_and_modify) == ['Frederik', 'Wilhelmine']
+
+
+def test_async_refresh_structure_keeps_lookups_working(run_async, interface):
+
+    async def refresh(async_interface):
+        c_person = async_interface.get_class_by_name('person')
+        with interface.transaction():
+            interface.create_class('customer', interface.get_class_by_name('person'))
+        refreshed = asyncio.create_task(async_interface.refresh_structure())
+
+        # Während des Neuladens bleibt der bisherige Strukturcache verwendbar
+        await asyncio.sleep(0)
+        assert async_interface.get_class_by_name('person').id == c_person.id
+        assert await refreshed
+        return async_interface.get_class_by_name('customer').get_parent().id == c_person.id
+    assert run_async(refresh)
+
+
+def test_async_find_pages_with_keyset(run_async):
+
+    async def find_pages(interface):
+        c_person = interface.get_class_by_name('person')
+        async with interface.transaction():
+            for first_name in ('Fred', 'Wilma', 'Barney', 'Betty'):
+                await interface.create_object(c_person, first_name=first_name)
+        first_page = await interface.find(c_person, order_by='first_name', limit=2)
+        second_page = await interface.find(c_person, order_by='first_name', limit=2, after=first_page[-1])
+        matches = await interface.find(c_person, where={'first_name': ('in', ['Fred', 'Wilma'])}, order_by='-first_name')
+        return [o.get_value('first_name') for o in first_page + second_page], [o.get_value('first_name') for o in matches]
+    assert run_async(find_pages) == (['Barney', 'Betty', 'Fred', 'Wilma'], ['Wilma', 'Fred'])
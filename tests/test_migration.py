@@ -0,0 +1,23 @@
+import pytest
+from exception import MigrationError
+
+
+def test_migration_rejects_unknown_class(interface, schema):
+    migration = interface.migration()
+    migration.create_attribute('street', 'VARCHAR(100)', True)
+    migration.assign_attribute('street', 'adress', True)
+    with pytest.raises(MigrationError, match='adress'):
+        migration.plan()
+    with pytest.raises(MigrationError, match='adress'):
+        migration.apply()
+
+
+def test_migration_adds_indexed_attribute(interface, schema):
+    c_person, c_address = schema
+    migration = interface.migration()
+    migration.create_attribute('street', 'VARCHAR(100)', True)
+    migration.assign_attribute('street', 'address', True)
+    migration.apply()
+    with interface.transaction():
+        address = interface.create_object(c_address, city='Bedrock', street='Cobblestone Way')
+    assert interface.get_object(address.id, c_address).get_value('street') == 'Cobblestone Way'
@@ -0,0 +1,57 @@
+import threading
+import pytest
+from interface import UserInterface
+
+
+@pytest.fixture
+def cached_interface(root_user, connection_pool, schema):
+    interface = UserInterface(root_user, connection_pool, object_cache_size=100)
+    yield interface
+    interface.disconnect()
+
+
+def run_in_thread(function):
+    """ Führt die Funktion in einem eigenen Thread (mit eigener Verbindung) aus und gibt ihr Ergebnis zurück """
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_uncommitted_writes_are_not_shared(cached_interface, schema):
+    c_person, c_address = schema
+    with cached_interface.transaction():
+        person = cached_interface.create_object(c_person, first_name='Fred')
+    with cached_interface.transaction():
+        person.modify(first_name='Frederik')
+        assert cached_interface.get_object(person.id, c_person).get_value('first_name') == 'Frederik'
+        assert cached_interface.object_cache.get(person.id) is None
+
+        def read_first_name():
+            with cached_interface.transaction():
+                return cached_interface.get_object(person.id, c_person).get_value('first_name')
+        assert run_in_thread(read_first_name) == 'Fred'
+    assert cached_interface.object_cache.get(person.id) is person
+
+
+def test_rolled_back_objects_are_not_cached(cached_interface, schema):
+    c_person, c_address = schema
+    with pytest.raises(RuntimeError):
+        with cached_interface.transaction():
+            person = cached_interface.create_object(c_person, first_name='Fred')
+            raise RuntimeError()
+    assert cached_interface.object_cache.get(person.id) is None
+    with cached_interface.transaction():
+        assert cached_interface.get_object(person.id, c_person) is None
+
+
+def test_update_objects_evicts_cached_objects(cached_interface, schema):
+    c_person, c_address = schema
+    with cached_interface.transaction():
+        person = cached_interface.create_object(c_person, first_name='Fred')
+    with cached_interface.transaction():
+        cached_interface.update_objects([(person, {'first_name': 'Frederik'})])
+    assert cached_interface.object_cache.get(person.id) is None
+    with cached_interface.transaction():
+        assert cached_interface.get_object(person.id, c_person).get_value('first_name') == 'Frederik'
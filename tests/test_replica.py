@@ -0,0 +1,102 @@
+import os
+import time
+import pytest
+from psycopg2 import pool
+from interface import UserInterface
+from conftest import DSN
+
+# Ohne eigenes Replikat dient die Testdatenbank selbst als Replikat, geprüft wird die Auswahl der Verbindung
+REPLICA_DSN = os.environ.get('SQLOBINT_TEST_REPLICA_DSN', DSN)
+
+
+@pytest.fixture
+def replica_pool(connection_pool):
+    connection_pool = pool.ThreadedConnectionPool(0, 5, REPLICA_DSN)
+    yield connection_pool
+    connection_pool.closeall()
+
+
+@pytest.fixture
+def make_interface(root_user, connection_pool, schema):
+    """ Erzeugt Schnittstellen mit Replikaten auf der initialisierten Testdatenbank """
+    interfaces = []
+
+    def make_interface(replica_pools: list, replica_stickiness: float = 0):
+        interface = UserInterface(root_user, connection_pool, replica_pools=replica_pools, replica_stickiness=replica_stickiness)
+        interfaces.append(interface)
+        return interface
+    yield make_interface
+    for interface in interfaces:
+        interface.disconnect()
+
+
+def create_person(interface, c_person, first_name: str):
+    with interface.transaction():
+        return interface.create_object(c_person, first_name=first_name)
+
+
+def test_reads_use_replica_outside_transactions(make_interface, replica_pool, schema):
+    c_person, c_address = schema
+    interface = make_interface([replica_pool])
+    person = create_person(interface, c_person, 'Fred')
+
+    with interface.transaction():
+        assert interface.get_object(person.id, c_person).get_value('first_name') == 'Fred'
+        assert interface.replica_connection is None
+
+    assert interface.get_object(person.id, c_person).get_value('first_name') == 'Fred'
+    assert interface.replica_connection is not None
+    assert interface.replica_connection.autocommit
+
+
+def test_reads_stick_to_primary_after_commit(make_interface, replica_pool, schema):
+    c_person, c_address = schema
+    interface = make_interface([replica_pool], replica_stickiness=60)
+    person = create_person(interface, c_person, 'Fred')
+
+    assert interface.find(c_person, where={'first_name': 'Fred'})[0].id == person.id
+    assert interface.replica_connection is None
+
+    # Nach Ablauf von replica_stickiness wird wieder vom Replikat gelesen
+    interface.local.last_write = time.monotonic() - 60
+    assert interface.find(c_person, where={'first_name': 'Fred'})[0].id == person.id
+    assert interface.replica_connection is not None
+
+
+def test_failed_replica_connection_falls_back_to_primary(make_interface, replica_pool, schema):
+    c_person, c_address = schema
+    interface = make_interface([replica_pool])
+    person = create_person(interface, c_person, 'Fred')
+    interface.get_object(person.id, c_person)
+    pid = interface.replica_connection.get_backend_pid()
+
+    # Die Replikatverbindung bricht serverseitig ab, der Lesezugriff wird auf dem Primärserver wiederholt
+    with interface.transaction():
+        interface.cursor(read_only=True).execute('SELECT pg_terminate_backend(%s)', (pid,))
+    for _ in range(50):
+        with interface.transaction():
+            cursor = interface.cursor(read_only=True)
+            cursor.execute('SELECT 1 FROM pg_stat_activity WHERE pid = %s', (pid,))
+            if cursor.fetchone() is None:
+                break
+        time.sleep(0.1)
+    assert [o.id for o in interface.find(c_person)] == [person.id]
+    assert interface.replica_connection is None
+    assert interface.replica_failures[id(replica_pool)] > time.monotonic()
+
+    # Bis replica_retry abgelaufen ist, wird das Replikat übersprungen
+    interface.get_object(person.id, c_person)
+    assert interface.replica_connection is None
+
+
+def test_unreachable_replica_falls_back_to_primary(make_interface, schema):
+    c_person, c_address = schema
+    unreachable_pool = pool.ThreadedConnectionPool(0, 1, 'host=127.0.0.1 port=1 connect_timeout=1')
+    try:
+        interface = make_interface([unreachable_pool])
+        person = create_person(interface, c_person, 'Fred')
+        assert interface.get_object(person.id, c_person).get_value('first_name') == 'Fred'
+        assert interface.replica_connection is None
+        assert id(unreachable_pool) in interface.replica_failures
+    finally:
+        unreachable_pool.closeall()
@@ -0,0 +1,45 @@
+import pytest
+from exception import AttributeNotExists
+
+
+def test_session_autoflush_before_bind_and_reads(interface, schema):
+    c_person, c_address = schema
+    with interface.session():
+        person = interface.create_object(c_person, first_name='Fred')
+        address = interface.create_object(c_address, city='Bochum')
+
+        # bind() benötigt die Zeilen in data.meta, Lesezugriffe die vorgemerkten Änderungen
+        interface.bind(person, address, 'person_to_address')
+        person.modify(first_name='Frederik')
+        assert interface.get_object(person.id, c_person).get_value('first_name') == 'Frederik'
+        assert [o.id for o in interface.hop(person, 'person_to_address')] == [address.id]
+        assert [o.id for o in interface.find(c_person, where={'first_name': 'Frederik'})] == [person.id]
+
+    with interface.transaction():
+        assert interface.get_object(person.id, c_person).get_value('first_name') == 'Frederik'
+        assert interface.hop1(person, 'person_to_address').get_value('city') == 'Bochum'
+
+
+def test_session_batches_until_next_statement(interface, schema):
+    c_person, c_address = schema
+    with interface.session() as session:
+        persons = [interface.create_object(c_person, first_name=f'Person {i}') for i in range(3)]
+        for person in persons:
+            person.modify(first_name=f'{person.get_value("first_name")}!')
+        assert all(session.is_dirty(person) for person in persons)
+        assert len(interface.find(c_person)) == 3
+        assert not any(session.is_dirty(person) for person in persons)
+    with interface.transaction():
+        assert sorted(o.get_value('first_name') for o in interface.find(c_person)) == ['Person 0!', 'Person 1!', 'Person 2!']
+
+
+def test_modify_rejects_unknown_attributes(interface, schema):
+    c_person, c_address = schema
+    with interface.transaction():
+        person = interface.create_object(c_person, first_name='Fred')
+        with pytest.raises(AttributeNotExists):
+            person.modify(frist_name='Frederik')
+    with interface.session():
+        with pytest.raises(AttributeNotExists):
+            person.modify(frist_name='Frederik')
+        assert person.get_value('first_name') == 'Fred'
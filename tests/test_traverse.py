@@ -0,0 +1,22 @@
+def first_names(objects):
+    return sorted(o.get_value('first_name') for o in objects)
+
+
+def test_traverse_visits_each_object_once(interface, schema):
+    c_person, c_address = schema
+    with interface.transaction():
+        knows = interface.create_reference('knows', c_person, c_person)
+        fred, wilma, barney, betty = [interface.create_object(c_person, first_name=n) for n in ('Fred', 'Wilma', 'Barney', 'Betty')]
+        # Zyklen: Fred -> Wilma -> Barney -> Fred, dazu Fred -> Barney -> Betty
+        for origin, target in ((fred, wilma), (wilma, barney), (barney, fred), (fred, barney), (barney, betty)):
+            interface.bind(origin, target, knows)
+
+    # Trotz der Zyklen endet die Breitensuche, sobald keine neuen Objekte mehr erreicht werden
+    reached = interface.traverse(fred, knows, max_depth=1000)
+    assert first_names(reached[:2]) == ['Barney', 'Wilma']
+    assert first_names(reached[2:]) == ['Betty', 'Fred']
+    assert first_names(interface.traverse(fred, knows, max_depth=1)) == ['Barney', 'Wilma']
+
+    paths = {o.get_value('first_name'): path for o, path in interface.traverse(fred, knows, max_depth=3, with_paths=True)}
+    assert paths['Betty'] == [fred.id, barney.id, betty.id]
+    assert 'Fred' not in paths